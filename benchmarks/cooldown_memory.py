@@ -0,0 +1,100 @@
+"""
+Memory benchmark for utils.cooldowns.TTLStore.
+
+Simulates a million distinct members chatting over several hours of synthetic
+time and compares the footprint of a plain never-pruned dict keyed by
+(guild_id, user_id) with TTLStore. Time is driven by a fake clock, so the run
+takes seconds.
+
+Usage: python -m benchmarks.cooldown_memory [--users 1000000] [--ttl 60] [--rate 2000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from utils.cooldowns import TTLStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def workload(users: int, rate: float, seed: int = 0):
+    """Yield (t, guild_id, user_id): `rate` messages/second, each from a random member."""
+    rng = random.Random(seed)
+    guilds = [rng.getrandbits(60) for _ in range(50)]
+    for i in range(users * 2):
+        user = rng.randrange(users)
+        yield i / rate, guilds[user % len(guilds)], 10**17 + user
+
+
+def measure(make_store, record, args):
+    tracemalloc.start()
+    store, clock = make_store()
+    peak_entries = 0
+    start = time.perf_counter()
+    for t, guild_id, user_id in workload(args.users, args.rate):
+        clock.now = t
+        record(store, guild_id, user_id, t)
+        peak_entries = max(peak_entries, len(store))
+    elapsed = time.perf_counter() - start
+    if hasattr(store, "evict_expired"):
+        # Sweep now so final_entries counts live members only
+        store.evict_expired()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "final_entries": len(store),
+        "peak_entries": peak_entries,
+        "current_bytes": current,
+        "peak_bytes": peak,
+        # Footprint per entry; for the dict every entry ever written is kept
+        "bytes_per_entry": round(current / len(store), 1) if len(store) else None,
+        "peak_bytes_per_entry": round(peak / peak_entries, 1) if peak_entries else None,
+        "ns_per_message": round(elapsed / (args.users * 2) * 1e9),
+        "metrics": store.metrics() if hasattr(store, "metrics") else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--ttl", type=float, default=60)
+    parser.add_argument("--rate", type=float, default=2000, help="messages per synthetic second")
+    args = parser.parse_args(argv)
+
+    def make_dict():
+        return {}, FakeClock()
+
+    def record_dict(store, guild_id, user_id, t):
+        last = store.get((guild_id, user_id), 0)
+        if t - last >= args.ttl:
+            store[(guild_id, user_id)] = t
+
+    def make_ttl():
+        clock = FakeClock()
+        return TTLStore(args.ttl, clock=clock), clock
+
+    def record_ttl(store, guild_id, user_id, t):
+        if not store.active(guild_id, user_id):
+            store.touch(guild_id, user_id)
+
+    results = {
+        "params": vars(args),
+        "dict": measure(make_dict, record_dict, args),
+        "ttl_store": measure(make_ttl, record_ttl, args),
+    }
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
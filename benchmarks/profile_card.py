@@ -0,0 +1,105 @@
+"""
+Per-card render time before and after caching the static card layers.
+
+"legacy" redraws the gradient, arcs, frame and bar track for every card the
+way make_profile_card used to; "cached" copies utils.render.card_base().
+Both then draw the same dynamic layer (text and XP fill) and encode a PNG, so
+the difference is the static-layer work. The run also checks that both paths
+produce identical pixels.
+
+Usage: python -m benchmarks.profile_card [--cards 50]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from io import BytesIO
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from utils import render
+
+
+def legacy_static_layers() -> Image.Image:
+    width, height = 1000, 400
+    background = Image.new("RGBA", (width, height), (20, 20, 30, 255))
+    draw = ImageDraw.Draw(background)
+    for y in range(height):
+        r = int(20 + (40 * y / height))
+        g = int(20 + (30 * y / height))
+        b = int(30 + (50 * y / height))
+        draw.line([(0, y), (width, y)], fill=(r, g, b, 255))
+    for i in range(50):
+        x = int(width * 0.7 + width * 0.3 * (i / 50))
+        alpha = int(100 * (1 - i / 50))
+        draw.ellipse([x-150, -50, x+150, 250], outline=(100, 100, 200, alpha), width=5)
+    draw.rounded_rectangle([320, 210, 920, 240], radius=10, fill=(50, 50, 70, 255))
+    draw.rectangle([310, 50, 930, 330], outline=(100, 100, 150, 255), width=2)
+    return background
+
+
+def cached_static_layers() -> Image.Image:
+    return render.card_base().copy()
+
+
+def draw_dynamic(background: Image.Image, font) -> bytes:
+    draw = ImageDraw.Draw(background)
+    draw.text((320, 60), "Benchmark User", font=font, fill=(255, 255, 255, 255))
+    draw.text((320, 120), "Level: 12", font=font, fill=(200, 200, 255, 255))
+    draw.text((500, 120), "Rank: #3", font=font, fill=(200, 200, 255, 255))
+    draw.text((320, 160), "XP: 12345", font=font, fill=(200, 255, 200, 255))
+    draw.rounded_rectangle([320, 210, 320 + 250, 240], radius=10, fill=(100, 150, 255, 255))
+    draw.text((330, 215), "12345/12600 XP", font=font, fill=(255, 255, 255, 255))
+    out = BytesIO()
+    background.save(out, format="PNG")
+    return out.getvalue()
+
+
+def timed(fn, cards: int) -> dict:
+    samples = []
+    for _ in range(cards):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples), 2),
+        "p50_ms": round(samples[len(samples) // 2], 2),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    font = ImageFont.load_default()
+    # One-off cost of building the cached layers, paid once per theme
+    render.card_base.cache_clear()
+    start = time.perf_counter()
+    render.card_base()
+    warmup_ms = (time.perf_counter() - start) * 1000
+    identical = ImageChops.difference(legacy_static_layers(), cached_static_layers()).getbbox() is None
+
+    results = {
+        "params": vars(args),
+        "identical_pixels": identical,
+        "cache_build_ms": round(warmup_ms, 2),
+        "static_layers": {
+            "legacy": timed(legacy_static_layers, args.cards),
+            "cached": timed(cached_static_layers, args.cards),
+        },
+        "full_card": {
+            "legacy": timed(lambda: draw_dynamic(legacy_static_layers(), font), args.cards),
+            "cached": timed(lambda: draw_dynamic(cached_static_layers(), font), args.cards),
+        },
+    }
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
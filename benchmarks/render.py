@@ -0,0 +1,268 @@
+"""
+Rendering benchmark suite for profile cards and leaderboards.
+
+Cards and leaderboards go through the real Levels.make_profile_card() and
+make_leaderboard() helpers with fake members, guilds and bot services: the
+renderer runs inline, avatars come from fixture images generated in memory,
+and the render cache never stores anything, so every iteration draws from
+scratch. PNG encoding and avatar decode/resize/mask are timed on their own.
+Nothing touches the network or Discord.
+
+Each case runs in a fresh process, so its peak RSS is its own. Results are
+JSON, including p50/p95 timings and peak memory. Pass --baseline with an
+earlier run (e.g. from another branch) to add p50/p95 ratios.
+
+Usage: python -m benchmarks.render [--iterations 50] [--cases card leaderboard_10]
+                                   [--baseline old.json] [--output new.json]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import multiprocessing
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import PIL
+from PIL import Image
+
+from utils import avatars, fonts, render
+from utils.render_cache import RenderCache
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CASES = ("card", "leaderboard_1", "leaderboard_10", "leaderboard_20",
+         "png_encode", "avatar_card", "avatar_leaderboard")
+
+
+# -------- Fixtures --------
+def fixture_avatar(seed: int, size: int) -> bytes:
+    """PNG bytes of a noisy two-tone image, standing in for a downloaded avatar."""
+    rng = random.Random(seed)
+    base = Image.new("RGB", (size, size), tuple(rng.randrange(256) for _ in range(3)))
+    noise = Image.effect_noise((size, size), 40).convert("RGB")
+    image = Image.blend(base, noise, 0.3)
+    out = BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+class FakeAsset:
+    def __init__(self, key: str, raw: bytes):
+        self.key = key
+        self.raw = raw
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, name: str):
+        self.id = guild_id
+        self.name = name
+        self.members = {}
+
+    def get_member(self, user_id: int):
+        return self.members.get(user_id)
+
+
+class FakeMember:
+    def __init__(self, guild: FakeGuild, user_id: int, name: str, asset: FakeAsset):
+        self.guild = guild
+        self.id = user_id
+        self.display_name = name
+        self.display_avatar = asset
+        self.joined_at = datetime.datetime(2023, 5, 17, tzinfo=datetime.timezone.utc)
+        guild.members[user_id] = self
+
+
+class InlineRenderer:
+    """Runs render functions directly, so timings are pure CPU with no pool overhead."""
+
+    async def run(self, fn, *args):
+        return fn(*args)
+
+
+class FixtureAvatars:
+    """Serves prepared fixture avatars, like an AvatarCache where every lookup is a hit."""
+
+    def __init__(self):
+        self._images = {}
+
+    async def get(self, asset, size: int):
+        key = (asset.key, size)
+        if key not in self._images:
+            self._images[key] = render.prepare_avatar(asset.raw, size)
+        return self._images[key]
+
+    async def get_many(self, assets, size: int, deadline: float = 2.0):
+        return [await self.get(asset, size) if asset is not None else None for asset in assets]
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.version = 0
+
+    async def get_leaderboard_snapshot(self, guild_id: int, limit: int = 10):
+        self.version += 1
+        return self.version, self.rows[:limit]
+
+
+class FakeBot:
+    def __init__(self, rows):
+        self.renderer = InlineRenderer()
+        self.avatars = FixtureAvatars()
+        self.db = FakeDB(rows)
+
+
+def build_fixtures():
+    guild = FakeGuild(1, "Benchmark Guild")
+    card_raw = fixture_avatar(0, avatars.cdn_size(render.CARD_AVATAR))
+    row_raw = [fixture_avatar(i, avatars.cdn_size(render.LEADERBOARD_AVATAR)) for i in range(20)]
+    member = FakeMember(guild, 10**17, "Benchmark User With A Long Display Name", FakeAsset("card", card_raw))
+    rows = []
+    for i, raw in enumerate(row_raw):
+        user_id = 10**17 + 1 + i
+        FakeMember(guild, user_id, f"Member {i} {'x' * (i % 12)}", FakeAsset(f"row{i}", raw))
+        rows.append((user_id, 50000 - i * 1700))
+    return guild, member, rows, card_raw, row_raw[0]
+
+
+def make_case(name: str):
+    """Return an async callable that performs one iteration of the named case."""
+    from cogs.levels import Levels
+
+    guild, member, rows, card_raw, row_raw = build_fixtures()
+    cog = Levels(FakeBot(rows))
+    cog.renders = RenderCache(max_bytes=0)  # Never stores, so every call renders
+    fonts.preload(render.FONTS)
+
+    if name == "card":
+        return lambda: cog.make_profile_card(member, 12345, 12, 3)
+    if name.startswith("leaderboard_"):
+        limit = int(name.split("_")[1])
+        return lambda: cog.make_leaderboard(guild, limit)
+    if name == "png_encode":
+        image = Image.open(BytesIO(render.render_profile_card(render.CardData(
+            "Benchmark User", guild.name, "2023-05-17", 12345, 12, 3, 12600, 0.4,
+            render.prepare_avatar(card_raw, render.CARD_AVATAR)))))
+        image.load()
+
+        async def encode():
+            return render._encode(image)
+        return encode
+    if name in ("avatar_card", "avatar_leaderboard"):
+        raw, size = (card_raw, render.CARD_AVATAR) if name == "avatar_card" else (row_raw, render.LEADERBOARD_AVATAR)
+
+        async def prepare():
+            return render.prepare_avatar(raw, size)
+        return prepare
+    raise ValueError(f"Unknown case {name!r}")
+
+
+# -------- Measurement --------
+def percentile(samples, q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+async def measure(name: str, iterations: int, warmup: int) -> dict:
+    step = make_case(name)
+    # Baseline after imports and fixtures, before the first render
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+    for _ in range(warmup):
+        await step()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await step()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+
+    # Python-level allocations in a separate pass, since tracing slows the timed one down
+    tracemalloc.start()
+    for _ in range(min(iterations, 5)):
+        await step()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "iterations": iterations,
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(percentile(samples, 0.5), 3),
+        "p95_ms": round(percentile(samples, 0.95), 3),
+        "min_ms": round(samples[0], 3),
+        "traced_peak_kib": round(traced_peak / 1024, 1),
+    }
+    if resource:
+        # ru_maxrss is KiB on Linux; unlike tracemalloc it includes Pillow's pixel buffers
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result["peak_rss_kib"] = rss_after
+        result["peak_rss_growth_kib"] = rss_after - rss_before
+    return result
+
+
+def run_case(name: str, iterations: int, warmup: int) -> dict:
+    return asyncio.run(measure(name, iterations, warmup))
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """Ratios new/old for p50 and p95 of every case present in both runs (< 1 is faster)."""
+    ratios = {}
+    for name, new in results["cases"].items():
+        old = baseline.get("cases", {}).get(name)
+        if not old:
+            continue
+        ratios[name] = {
+            metric: round(new[metric] / old[metric], 3) if old[metric] else None
+            for metric in ("p50_ms", "p95_ms")
+        }
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = {
+        "params": vars(args),
+        "environment": {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+        },
+        "cases": {},
+    }
+    # A fresh process per case, so one case's peak RSS doesn't carry into the next
+    context = multiprocessing.get_context("spawn")
+    for name in args.cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results["cases"][name] = pool.submit(run_case, name, args.iterations, args.warmup).result()
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            results["vs_baseline"] = compare(results, json.load(fp))
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# cogs/config.py
+import discord
+from discord import app_commands
+from discord.ext import commands
+from discord.ext.commands import has_permissions, MissingPermissions
+from utils.settings import SETTINGS
+
+SETTING_CHOICES = [app_commands.Choice(name=key, value=key) for key in SETTINGS]
+
+
+class Config(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def settings_embed(self, guild) -> discord.Embed:
+        settings = self.bot.settings.get(guild.id)
+        embed = discord.Embed(title=f"⚙️ Settings for {guild.name}", color=discord.Color.blue())
+        for key, setting in SETTINGS.items():
+            value = getattr(settings, key)
+            default = " (default)" if value == setting.default else ""
+            embed.add_field(name=key, value=f"`{setting.format(value)}`{default}\n{setting.description}", inline=False)
+        embed.set_footer(text="Change with config <key> <value>, or config <key> reset")
+        return embed
+
+    async def update(self, guild_id: int, key: str, value: str) -> str:
+        """Apply a config change and return the reply text"""
+        if key not in SETTINGS:
+            return f"❌ Unknown setting `{key}`. Options: {', '.join(SETTINGS)}"
+        setting = SETTINGS[key]
+        if value.lower() == "reset":
+            new = await self.bot.settings.reset(guild_id, key)
+            return f"✅ `{key}` reset to `{setting.format(new)}`"
+        try:
+            new = await self.bot.settings.set(guild_id, key, value)
+        except ValueError as e:
+            return f"❌ Invalid value for `{key}`: {e}"
+        return f"✅ `{key}` set to `{setting.format(new)}`"
+
+    @commands.command(name="config", aliases=["settings"])
+    @commands.guild_only()
+    @has_permissions(manage_guild=True)
+    async def config(self, ctx, key: str = None, *, value: str = None):
+        """Show or change this server's settings"""
+        if key is None:
+            await ctx.send(embed=self.settings_embed(ctx.guild))
+            return
+        if value is None:
+            await ctx.send(f"❌ Usage: `{ctx.clean_prefix}config {key} <value>` or `{ctx.clean_prefix}config {key} reset`")
+            return
+        await ctx.send(await self.update(ctx.guild.id, key.lower(), value))
+
+    @config.error
+    async def config_error(self, ctx, error):
+        if isinstance(error, MissingPermissions):
+            await ctx.send("❌ You don't have permission to use this command.")
+        else:
+            await ctx.send(f"❌ Error: {error}")
+
+    @app_commands.command(name="config", description="Show or change this server's settings")
+    @app_commands.guild_only()
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.describe(key="Setting to change", value="New value, or 'reset' for the default")
+    @app_commands.choices(key=SETTING_CHOICES)
+    async def config_slash(self, interaction: discord.Interaction, key: app_commands.Choice[str] = None, value: str = None):
+        if key is None or value is None:
+            await interaction.response.send_message(embed=self.settings_embed(interaction.guild), ephemeral=True)
+            return
+        await interaction.response.send_message(await self.update(interaction.guild.id, key.value, value))
+
+    @config_slash.error
+    async def config_slash_error(self, interaction: discord.Interaction, error):
+        await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Config(bot))
@@ -2,17 +2,31 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiohttp
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 import os
 import textwrap
 import math
+import tempfile
+from utils import fonts, level_curve, render
+from utils.render_cache import RenderCache
+from utils.xp_transfer import FORMATS, detect_format, read_import, write_export
+
+# Seconds a leaderboard waits for avatars before drawing placeholders
+LEADERBOARD_AVATAR_DEADLINE = 2.0
+
+# Finished card and leaderboard PNGs kept for repeat requests
+RENDER_CACHE_BYTES = 16 * 1024 * 1024
+RENDER_CACHE_TTL = 300
 
 class Levels(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.level_up_channel = None
+        self.renders = RenderCache(RENDER_CACHE_BYTES, RENDER_CACHE_TTL)
+
+    async def cog_load(self):
+        # Parse the bundled fonts now rather than on the first render
+        fonts.preload(render.FONTS)
         
     async def send_level_up_message(self, channel, user, level):
         """Send a level up announcement"""
@@ -25,109 +39,56 @@ class Levels(commands.Cog):
         await channel.send(embed=embed)
     
     # ------------------------------------------------------------------
-    # Helper: create an Arcane-style profile card
+    # Helpers: gather plain data here, draw on the render service (utils/render.py)
     async def make_profile_card(self, member: discord.Member, xp: int, level: int, rank: int):
-        # Create base image
-        width, height = 1000, 400
-        background = Image.new("RGBA", (width, height), (20, 20, 30, 255))
-        draw = ImageDraw.Draw(background)
-        
-        # Create gradient background
-        for y in range(height):
-            r = int(20 + (40 * y / height))
-            g = int(20 + (30 * y / height))
-            b = int(30 + (50 * y / height))
-            draw.line([(0, y), (width, y)], fill=(r, g, b, 255))
-        
-        # Add some visual effects
-        for i in range(50):
-            x = int(width * 0.7 + width * 0.3 * (i / 50))
-            alpha = int(100 * (1 - i / 50))
-            draw.ellipse([x-150, -50, x+150, 250], outline=(100, 100, 200, alpha), width=5)
-        
-        # Fetch avatar
-        try:
-            avatar_url = member.display_avatar.url
-            async with aiohttp.ClientSession() as session:
-                async with session.get(avatar_url) as resp:
-                    avatar_bytes = await resp.read()
-            
-            # Create circular avatar
-            avatar_img = Image.open(BytesIO(avatar_bytes)).convert("RGBA").resize((250, 250))
-            
-            # Create circular mask
-            mask = Image.new("L", (250, 250), 0)
-            mask_draw = ImageDraw.Draw(mask)
-            mask_draw.ellipse([(0, 0), (250, 250)], fill=255)
-            
-            # Apply mask and border
-            avatar_with_border = Image.new("RGBA", (256, 256), (0, 0, 0, 0))
-            avatar_with_border.paste(avatar_img, (3, 3), mask)
-            
-            # Add glow effect
-            glow = avatar_img.filter(ImageFilter.GaussianBlur(10))
-            background.paste(glow, (50, 50), glow)
-            background.paste(avatar_with_border, (53, 53), avatar_with_border)
-            
-        except Exception as e:
-            print(f"Avatar error: {e}")
-        
-        # Try to load a font, fallback to default if not available
-        try:
-            title_font = ImageFont.truetype("arialbd.ttf", 40)
-            normal_font = ImageFont.truetype("arial.ttf", 24)
-            small_font = ImageFont.truetype("arial.ttf", 20)
-        except:
-            title_font = ImageFont.load_default()
-            normal_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-        
-        # User info
-        username = f"{member.display_name}"
-        if len(username) > 15:
-            username = username[:15] + "..."
-        
-        draw.text((320, 60), username, font=title_font, fill=(255, 255, 255, 255))
-        
-        # Level and rank
-        draw.text((320, 120), f"Level: {level}", font=normal_font, fill=(200, 200, 255, 255))
-        draw.text((500, 120), f"Rank: #{rank}", font=normal_font, fill=(200, 200, 255, 255))
-        
-        # XP
-        draw.text((320, 160), f"XP: {xp}", font=normal_font, fill=(200, 255, 200, 255))
-        
-        # Calculate XP progress
-        next_level_xp = ((level + 1) / 0.1) ** 2  # Calculate XP needed for next level
-        progress = min(1.0, xp / next_level_xp) if next_level_xp > 0 else 0
-        
-        # XP bar background
-        bar_x, bar_y = 320, 210
-        bar_w, bar_h = 600, 30
-        draw.rounded_rectangle([bar_x, bar_y, bar_x + bar_w, bar_y + bar_h], radius=10, fill=(50, 50, 70, 255))
-        
-        # XP bar fill
-        filled = int(bar_w * progress)
-        if filled > 0:
-            draw.rounded_rectangle([bar_x, bar_y, bar_x + filled, bar_y + bar_h], radius=10, fill=(100, 150, 255, 255))
-        
-        # XP text on bar
-        draw.text((bar_x + 10, bar_y + 5), f"{xp}/{int(next_level_xp)} XP", font=small_font, fill=(255, 255, 255, 255))
-        
-        # Progress percentage
-        draw.text((bar_x + bar_w - 50, bar_y + 5), f"{int(progress*100)}%", font=small_font, fill=(255, 255, 255, 255))
-        
-        # Server stats
-        draw.text((320, 260), f"Server: {member.guild.name}", font=small_font, fill=(200, 200, 200, 255))
-        draw.text((320, 290), f"Joined: {member.joined_at.strftime('%Y-%m-%d')}", font=small_font, fill=(200, 200, 200, 255))
-        
-        # Add some decorative elements
-        draw.rectangle([310, 50, 930, 330], outline=(100, 100, 150, 255), width=2)
-        
-        # Return bytes
-        out = BytesIO()
-        background.save(out, format="PNG")
-        out.seek(0)
-        return out
+        # Everything drawn on the card is in the key, so a hit is always up to date
+        avatar = member.display_avatar
+        joined = member.joined_at.strftime('%Y-%m-%d')
+        key = ("profile", member.guild.id, member.id, xp, rank, avatar.key,
+               member.display_name, member.guild.name, joined, render.DEFAULT_THEME)
+
+        async def draw():
+            curve = level_curve.progress(xp)
+            card = render.CardData(
+                name=member.display_name,
+                guild_name=member.guild.name,
+                joined=joined,
+                xp=xp,
+                level=level,
+                rank=rank,
+                ceiling=curve.ceiling,
+                fraction=curve.fraction,
+                avatar=await self.bot.avatars.get(avatar, render.CARD_AVATAR),
+            )
+            png = await self.bot.renderer.run(render.render_profile_card, card)
+            # Don't keep a card whose avatar failed to load
+            return png, card.avatar is not None
+
+        return BytesIO(await self.renders.get_or_render(key, draw))
+
+    async def make_leaderboard(self, guild: discord.Guild, limit: int):
+        # The snapshot version only moves when the top rows change, so until then
+        # the key (and the cached image) stays the same
+        version, rows = await self.bot.db.get_leaderboard_snapshot(guild.id, limit)
+        members = [guild.get_member(user_id) for user_id, _ in rows]
+        names = [member.display_name if member else f"User {user_id}" for (user_id, _), member in zip(rows, members)]
+        assets = [member.display_avatar if member else None for member in members]
+        key = ("leaderboard", guild.id, limit, version, guild.name,
+               tuple((name, asset.key if asset else None) for name, asset in zip(names, assets)))
+
+        async def draw():
+            # Fetch every avatar at once before drawing; late ones get a placeholder
+            avatars = await self.bot.avatars.get_many(assets, render.LEADERBOARD_AVATAR, deadline=LEADERBOARD_AVATAR_DEADLINE)
+            entries = []
+            curves = level_curve.progress_for(xp for _, xp in rows)
+            for (_, xp), name, avatar, curve in zip(rows, names, avatars, curves):
+                entries.append(render.LeaderboardRow(name, curve.level, xp, curve.fraction, avatar))
+            png = await self.bot.renderer.run(render.render_leaderboard, guild.name, entries, limit)
+            # Placeholders mean some avatars were late; render again next time
+            complete = all(avatar is not None for avatar, asset in zip(avatars, assets) if asset is not None)
+            return png, complete
+
+        return BytesIO(await self.renders.get_or_render(key, draw))
 
     # --------- Profile command (different from level) ---------
     @commands.command(name="profile")
@@ -138,12 +99,7 @@ class Levels(commands.Cog):
             level = self.bot.db.xp_to_level(xp)
             
             # Get user's rank
-            leaderboard = await self.bot.db.get_leaderboard(ctx.guild.id, 1000)
-            user_ids = [user_id for user_id, _ in leaderboard]
-            try:
-                rank = user_ids.index(member.id) + 1
-            except ValueError:
-                rank = len(user_ids) + 1
+            rank, _ = await self.bot.db.get_rank(member.id, ctx.guild.id)
                 
             # generate image
             card = await self.make_profile_card(member, xp, level, rank)
@@ -160,21 +116,15 @@ class Levels(commands.Cog):
             level = self.bot.db.xp_to_level(xp)
             
             # Get user's rank
-            leaderboard = await self.bot.db.get_leaderboard(ctx.guild.id, 1000)
-            user_ids = [user_id for user_id, _ in leaderboard]
-            try:
-                rank = user_ids.index(member.id) + 1
-            except ValueError:
-                rank = len(user_ids) + 1
+            rank, total = await self.bot.db.get_rank(member.id, ctx.guild.id)
                 
             embed = discord.Embed(title=f"{member.display_name}'s Level", color=discord.Color.blue())
             embed.add_field(name="Level", value=level, inline=True)
             embed.add_field(name="XP", value=xp, inline=True)
-            embed.add_field(name="Rank", value=f"#{rank}", inline=True)
+            embed.add_field(name="Rank", value=f"#{rank} of {total}", inline=True)
             
-            # Calculate progress to next level
-            next_level_xp = ((level + 1) / 0.1) ** 2  # Calculate XP needed for next level
-            progress = min(1.0, xp / next_level_xp) if next_level_xp > 0 else 0
+            # Progress through the current level
+            progress = level_curve.progress(xp).fraction
             
             # Progress bar
             bar_length = 20
@@ -197,11 +147,7 @@ class Levels(commands.Cog):
             await ctx.reply("Amount must be positive.")
             return
             
-        current_xp = await self.bot.db.get_user(member.id, ctx.guild.id)
-        new_xp = current_xp + amount
-        await self.bot.db.set_xp(member.id, ctx.guild.id, new_xp)
-        
-        new_level = self.bot.db.xp_to_level(new_xp)
+        _, _, _, new_level = await self.bot.db.award_xp(member.id, ctx.guild.id, amount)
         await ctx.reply(f"Added {amount} XP to {member.mention}. They are now level {new_level}.")
 
     @commands.command(name="removexp")
@@ -212,11 +158,7 @@ class Levels(commands.Cog):
             await ctx.reply("Amount must be positive.")
             return
             
-        current_xp = await self.bot.db.get_user(member.id, ctx.guild.id)
-        new_xp = max(0, current_xp - amount)
-        await self.bot.db.set_xp(member.id, ctx.guild.id, new_xp)
-        
-        new_level = self.bot.db.xp_to_level(new_xp)
+        _, _, _, new_level = await self.bot.db.award_xp(member.id, ctx.guild.id, -amount)
         await ctx.reply(f"Removed {amount} XP from {member.mention}. They are now level {new_level}.")
 
     @commands.command(name="setxp")
@@ -239,82 +181,57 @@ class Levels(commands.Cog):
         await self.bot.db.set_xp(member.id, ctx.guild.id, 0)
         await ctx.reply(f"Reset {member.mention}'s XP. They are now level 1.")
 
+    # --------- Bulk XP transfer (Bot owner only) ---------
+    @commands.command(name="exportxp")
+    @commands.is_owner()
+    async def exportxp_prefix(self, ctx, fmt: str = "csv"):
+        """Export this server's XP as a CSV or JSONL file"""
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            await ctx.reply("Format must be `csv` or `jsonl`.")
+            return
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"xp-{ctx.guild.id}.{fmt}")
+            with open(path, "w", newline="", encoding="utf-8") as fp:
+                count = await write_export(self.bot.db, ctx.guild.id, fp, fmt)
+            await ctx.reply(f"Exported XP for {count} users.", file=discord.File(path))
+
+    @commands.command(name="importxp")
+    @commands.is_owner()
+    async def importxp_prefix(self, ctx, mode: str = "set"):
+        """Import XP from an attached CSV or JSONL file (mode: set or add)"""
+        if not ctx.message.attachments:
+            await ctx.reply("Attach a `.csv` or `.jsonl` file with `user_id` and `xp` columns.")
+            return
+        if mode not in ("set", "add"):
+            await ctx.reply("Mode must be `set` or `add`.")
+            return
+
+        attachment = ctx.message.attachments[0]
+        try:
+            fmt = detect_format(attachment.filename)
+        except ValueError as e:
+            await ctx.reply(str(e))
+            return
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "import")
+            await attachment.save(path)
+            with open(path, newline="", encoding="utf-8") as fp:
+                try:
+                    count = await self.bot.db.import_xp(ctx.guild.id, read_import(fp, fmt), mode)
+                except ValueError as e:
+                    await ctx.reply(f"Import failed, nothing was changed: {e}")
+                    return
+        await ctx.reply(f"Imported XP for {count} users ({mode}).")
+
     # Leaderboard with image
     @commands.command(name="leaderboard", aliases=["lb"])
     async def leaderboard_prefix(self, ctx, limit: int = 10):
         limit = max(1, min(20, limit))  # Max 20 for image
         try:
-            rows = await self.bot.db.get_leaderboard(ctx.guild.id, limit)
-            
-            # Create leaderboard image
-            width, height = 800, 200 + (limit * 80)
-            background = Image.new("RGBA", (width, height), (30, 30, 40, 255))
-            draw = ImageDraw.Draw(background)
-            
-            # Title
-            try:
-                font_large = ImageFont.truetype("arialbd.ttf", 36)
-                font_medium = ImageFont.truetype("arial.ttf", 24)
-                font_small = ImageFont.truetype("arial.ttf", 20)
-            except:
-                font_large = ImageFont.load_default()
-                font_medium = ImageFont.load_default()
-                font_small = ImageFont.load_default()
-                
-            draw.text((width//2, 30), f"🏆 {ctx.guild.name} Leaderboard", font=font_large, 
-                     fill=(255, 215, 0, 255), anchor="mm")
-            
-            y_pos = 100
-            for idx, (user_id, xp) in enumerate(rows, start=1):
-                member = ctx.guild.get_member(user_id)
-                name = member.display_name if member else f"User {user_id}"
-                level = self.bot.db.xp_to_level(xp)
-                
-                # Rank badge
-                badge_colors = {
-                    1: (255, 215, 0),  # Gold
-                    2: (192, 192, 192),  # Silver
-                    3: (205, 127, 50)   # Bronze
-                }
-                
-                color = badge_colors.get(idx, (100, 100, 150))
-                draw.ellipse([50, y_pos-25, 90, y_pos+15], fill=color + (255,))
-                draw.text((70, y_pos-5), str(idx), font=font_medium, fill=(0, 0, 0, 255), anchor="mm")
-                
-                # User info
-                if member:
-                    try:
-                        avatar_url = member.display_avatar.url
-                        async with aiohttp.ClientSession() as session:
-                            async with session.get(avatar_url) as resp:
-                                avatar_bytes = await resp.read()
-                        
-                        avatar_img = Image.open(BytesIO(avatar_bytes)).convert("RGBA").resize((50, 50))
-                        mask = Image.new("L", (50, 50), 0)
-                        mask_draw = ImageDraw.Draw(mask)
-                        mask_draw.ellipse([(0, 0), (50, 50)], fill=255)
-                        
-                        background.paste(avatar_img, (100, y_pos-25), mask)
-                    except:
-                        pass
-                
-                # Name and stats
-                draw.text((160, y_pos-15), name, font=font_medium, fill=(255, 255, 255, 255))
-                draw.text((160, y_pos+10), f"Level {level} | {xp} XP", font=font_small, fill=(200, 200, 200, 255))
-                
-                # XP bar
-                next_level_xp = ((level + 1) / 0.1) ** 2  # Calculate XP needed for next level
-                progress = min(1.0, xp / next_level_xp) if next_level_xp > 0 else 0
-                bar_width = 300
-                draw.rectangle([450, y_pos-5, 450 + bar_width, y_pos+5], fill=(50, 50, 70, 255))
-                draw.rectangle([450, y_pos-5, 450 + int(bar_width * progress), y_pos+5], fill=(100, 150, 255, 255))
-                
-                y_pos += 80
-            
-            # Save and send
-            out = BytesIO()
-            background.save(out, format="PNG")
-            out.seek(0)
+            out = await self.make_leaderboard(ctx.guild, limit)
             await ctx.reply(file=discord.File(out, filename="leaderboard.png"))
             
         except Exception as e:
@@ -323,10 +240,10 @@ class Levels(commands.Cog):
                 rows = await self.bot.db.get_leaderboard(ctx.guild.id, limit)
                 embed = discord.Embed(title=f"🏆 Leaderboard — Top {limit}", color=discord.Color.blurple())
                 desc = ""
-                for idx, (user_id, xp) in enumerate(rows, start=1):
+                levels = level_curve.levels_for(xp for _, xp in rows)
+                for idx, ((user_id, xp), level) in enumerate(zip(rows, levels), start=1):
                     member = ctx.guild.get_member(user_id)
                     name = member.display_name if member else f"<Left user {user_id}>"
-                    level = self.bot.db.xp_to_level(xp)
                     desc += f"**{idx}.** {name} — Level {level} • {xp} XP\n"
                 if desc == "":
                     desc = "No data yet."
@@ -346,12 +263,7 @@ class Levels(commands.Cog):
             level = self.bot.db.xp_to_level(xp)
             
             # Get user's rank
-            leaderboard = await self.bot.db.get_leaderboard(interaction.guild.id, 1000)
-            user_ids = [user_id for user_id, _ in leaderboard]
-            try:
-                rank = user_ids.index(user.id) + 1
-            except ValueError:
-                rank = len(user_ids) + 1
+            rank, _ = await self.bot.db.get_rank(user.id, interaction.guild.id)
                 
             card = await self.make_profile_card(user, xp, level, rank)
             await interaction.followup.send(file=discord.File(card, filename="profile.png"))
@@ -368,21 +280,15 @@ class Levels(commands.Cog):
             level = self.bot.db.xp_to_level(xp)
             
             # Get user's rank
-            leaderboard = await self.bot.db.get_leaderboard(interaction.guild.id, 1000)
-            user_ids = [user_id for user_id, _ in leaderboard]
-            try:
-                rank = user_ids.index(user.id) + 1
-            except ValueError:
-                rank = len(user_ids) + 1
+            rank, total = await self.bot.db.get_rank(user.id, interaction.guild.id)
                 
             embed = discord.Embed(title=f"{user.display_name}'s Level", color=discord.Color.blue())
             embed.add_field(name="Level", value=level, inline=True)
             embed.add_field(name="XP", value=xp, inline=True)
-            embed.add_field(name="Rank", value=f"#{rank}", inline=True)
+            embed.add_field(name="Rank", value=f"#{rank} of {total}", inline=True)
             
-            # Calculate progress to next level
-            next_level_xp = ((level + 1) / 0.1) ** 2  # Calculate XP needed for next level
-            progress = min(1.0, xp / next_level_xp) if next_level_xp > 0 else 0
+            # Progress through the current level
+            progress = level_curve.progress(xp).fraction
             
             # Progress bar
             bar_length = 20
@@ -402,77 +308,7 @@ class Levels(commands.Cog):
         await interaction.response.defer()
         limit = max(1, min(20, limit))
         try:
-            rows = await self.bot.db.get_leaderboard(interaction.guild.id, limit)
-            
-            # Create leaderboard image
-            width, height = 800, 200 + (limit * 80)
-            background = Image.new("RGBA", (width, height), (30, 30, 40, 255))
-            draw = ImageDraw.Draw(background)
-            
-            # Title
-            try:
-                font_large = ImageFont.truetype("arialbd.ttf", 36)
-                font_medium = ImageFont.truetype("arial.ttf", 24)
-                font_small = ImageFont.truetype("arial.ttf", 20)
-            except:
-                font_large = ImageFont.load_default()
-                font_medium = ImageFont.load_default()
-                font_small = ImageFont.load_default()
-                
-            draw.text((width//2, 30), f"🏆 {interaction.guild.name} Leaderboard", font=font_large, 
-                     fill=(255, 215, 0, 255), anchor="mm")
-            
-            y_pos = 100
-            for idx, (user_id, xp) in enumerate(rows, start=1):
-                member = interaction.guild.get_member(user_id)
-                name = member.display_name if member else f"User {user_id}"
-                level = self.bot.db.xp_to_level(xp)
-                
-                # Rank badge
-                badge_colors = {
-                    1: (255, 215, 0),  # Gold
-                    2: (192, 192, 192),  # Silver
-                    3: (205, 127, 50)   # Bronze
-                }
-                
-                color = badge_colors.get(idx, (100, 100, 150))
-                draw.ellipse([50, y_pos-25, 90, y_pos+15], fill=color + (255,))
-                draw.text((70, y_pos-5), str(idx), font=font_medium, fill=(0, 0, 0, 255), anchor="mm")
-                
-                # User info
-                if member:
-                    try:
-                        avatar_url = member.display_avatar.url
-                        async with aiohttp.ClientSession() as session:
-                            async with session.get(avatar_url) as resp:
-                                avatar_bytes = await resp.read()
-                        
-                        avatar_img = Image.open(BytesIO(avatar_bytes)).convert("RGBA").resize((50, 50))
-                        mask = Image.new("L", (50, 50), 0)
-                        mask_draw = ImageDraw.Draw(mask)
-                        mask_draw.ellipse([(0, 0), (50, 50)], fill=255)
-                        
-                        background.paste(avatar_img, (100, y_pos-25), mask)
-                    except:
-                        pass
-                
-                # Name and stats
-                draw.text((160, y_pos-15), name, font=font_medium, fill=(255, 255, 255, 255))
-                draw.text((160, y_pos+10), f"Level {level} | {xp} XP", font=font_small, fill=(200, 200, 200, 255))
-                
-                # XP bar
-                next_level_xp = ((level + 1) / 0.1) ** 2  # Calculate XP needed for next level
-                progress = min(1.0, xp / next_level_xp) if next_level_xp > 0 else 0
-                bar_width = 300
-                draw.rectangle([450, y_pos-5, 450 + bar_width, y_pos+5], fill=(50, 50, 70, 255))
-                draw.rectangle([450, y_pos-5, 450 + int(bar_width * progress), y_pos+5], fill=(100, 150, 255, 255))
-                
-                y_pos += 80
-            
-            # Save and send
-            out = BytesIO()
-            background.save(out, format="PNG")
-            out.seek(0)
+            out = await self.make_leaderboard(interaction.guild, limit)
             await interaction.followup.send(file=discord.File(out, filename="leaderboard.png"))
             
         except Exception as e:
@@ -481,10 +317,10 @@ class Levels(commands.Cog):
                 rows = await self.bot.db.get_leaderboard(interaction.guild.id, limit)
                 embed = discord.Embed(title=f"🏆 Leaderboard — Top {limit}", color=discord.Color.blurple())
                 desc = ""
-                for idx, (user_id, xp) in enumerate(rows, start=1):
+                levels = level_curve.levels_for(xp for _, xp in rows)
+                for idx, ((user_id, xp), level) in enumerate(zip(rows, levels), start=1):
                     member = interaction.guild.get_member(user_id)
                     name = member.display_name if member else f"<Left user {user_id}>"
-                    level = self.bot.db.xp_to_level(xp)
                     desc += f"**{idx}.** {name} — Level {level} • {xp} XP\n"
                 if desc == "":
                     desc = "No data yet."
@@ -504,11 +340,7 @@ class Levels(commands.Cog):
             await interaction.followup.send("Amount must be positive.")
             return
             
-        current_xp = await self.bot.db.get_user(user.id, interaction.guild.id)
-        new_xp = current_xp + amount
-        await self.bot.db.set_xp(user.id, interaction.guild.id, new_xp)
-        
-        new_level = self.bot.db.xp_to_level(new_xp)
+        _, _, _, new_level = await self.bot.db.award_xp(user.id, interaction.guild.id, amount)
         await interaction.followup.send(f"Added {amount} XP to {user.mention}. They are now level {new_level}.")
 
     @app_commands.command(name="removexp", description="Remove XP from a user")
@@ -521,11 +353,7 @@ class Levels(commands.Cog):
             await interaction.followup.send("Amount must be positive.")
             return
             
-        current_xp = await self.bot.db.get_user(user.id, interaction.guild.id)
-        new_xp = max(0, current_xp - amount)
-        await self.bot.db.set_xp(user.id, interaction.guild.id, new_xp)
-        
-        new_level = self.bot.db.xp_to_level(new_xp)
+        _, _, _, new_level = await self.bot.db.award_xp(user.id, interaction.guild.id, -amount)
         await interaction.followup.send(f"Removed {amount} XP from {user.mention}. They are now level {new_level}.")
 
     @app_commands.command(name="setxp", description="Set a user's XP to a specific value")
@@ -48,18 +48,13 @@ class Misc(commands.Cog):
         warns = await self.bot.db.get_warns(member.id, ctx.guild.id)
         
         # Get user's rank
-        leaderboard = await self.bot.db.get_leaderboard(ctx.guild.id, 1000)
-        user_ids = [user_id for user_id, _ in leaderboard]
-        try:
-            rank = user_ids.index(member.id) + 1
-        except ValueError:
-            rank = len(user_ids) + 1
+        rank, total = await self.bot.db.get_rank(member.id, ctx.guild.id)
         
         embed = discord.Embed(title=f"{member}", color=discord.Color.green())
         embed.set_thumbnail(url=member.display_avatar.url)
         embed.add_field(name="ID", value=member.id, inline=True)
         embed.add_field(name="Level", value=level, inline=True)
-        embed.add_field(name="Rank", value=f"#{rank}", inline=True)
+        embed.add_field(name="Rank", value=f"#{rank} of {total}", inline=True)
         embed.add_field(name="XP", value=xp, inline=True)
         embed.add_field(name="Warns", value=warns, inline=True)
         embed.add_field(name="Account Created", value=member.created_at.strftime("%Y-%m-%d"), inline=True)
@@ -90,18 +85,13 @@ class Misc(commands.Cog):
         warns = await self.bot.db.get_warns(user.id, interaction.guild.id)
         
         # Get user's rank
-        leaderboard = await self.bot.db.get_leaderboard(interaction.guild.id, 1000)
-        user_ids = [user_id for user_id, _ in leaderboard]
-        try:
-            rank = user_ids.index(user.id) + 1
-        except ValueError:
-            rank = len(user_ids) + 1
+        rank, total = await self.bot.db.get_rank(user.id, interaction.guild.id)
         
         embed = discord.Embed(title=f"{user}", color=discord.Color.green())
         embed.set_thumbnail(url=user.display_avatar.url)
         embed.add_field(name="ID", value=user.id, inline=True)
         embed.add_field(name="Level", value=level, inline=True)
-        embed.add_field(name="Rank", value=f"#{rank}", inline=True)
+        embed.add_field(name="Rank", value=f"#{rank} of {total}", inline=True)
         embed.add_field(name="XP", value=xp, inline=True)
         embed.add_field(name="Warns", value=warns, inline=True)
         embed.add_field(name="Account Created", value=user.created_at.strftime("%Y-%m-%d"), inline=True)
@@ -167,6 +157,56 @@ class Misc(commands.Cog):
         
         await interaction.response.send_message(embed=embed)
 
+    # Bot internals (owner only)
+    @commands.command(name="stats")
+    @commands.is_owner()
+    async def stats(self, ctx):
+        embed = discord.Embed(title="📈 Bot Stats", color=discord.Color.blue())
+        embed.add_field(name="Latency", value=f"{round(self.bot.latency * 1000)}ms", inline=False)
+
+        pipeline = getattr(self.bot, "pipeline", None)
+        if pipeline:
+            m = pipeline.metrics()
+            embed.add_field(name="Event Queue", value=f"{m['depth']}/{m['capacity']} queued (peak {m['max_depth']})", inline=False)
+            embed.add_field(name="Processing Lag", value=f"avg {m['lag_avg_ms']}ms • max {m['lag_max_ms']}ms", inline=False)
+            embed.add_field(
+                name="Jobs",
+                value=f"{m['processed']} done • {m['failed']} failed • {m['dropped']} dropped • {m['coalesced']} coalesced • {m['overflowed']} overflowed",
+                inline=False
+            )
+
+        renderer = getattr(self.bot, "renderer", None)
+        if renderer:
+            m = renderer.metrics()
+            embed.add_field(
+                name="Rendering",
+                value=f"{m['executor']} pool • {m['in_flight']}/{m['capacity']} in flight • "
+                      f"{m['rendered']} done (avg {m['avg_ms']}ms) • {m['rejected']} rejected",
+                inline=False
+            )
+
+        avatars = getattr(self.bot, "avatars", None)
+        if avatars:
+            m = avatars.metrics()
+            embed.add_field(
+                name="Avatar Cache",
+                value=f"{m['entries']} avatars • {m['bytes'] // 1024}/{m['max_bytes'] // 1024} KiB • "
+                      f"{m['hits']} hits • {m['disk_hits']} disk • {m['downloads']} downloads • {m['failures']} failed",
+                inline=False
+            )
+
+        levels = self.bot.get_cog("Levels")
+        if levels:
+            m = levels.renders.metrics()
+            embed.add_field(
+                name="Render Cache",
+                value=f"{m['entries']} images • {m['bytes'] // 1024}/{m['max_bytes'] // 1024} KiB • "
+                      f"{m['hits']} hits • {m['misses']} renders • {m['shared']} shared",
+                inline=False
+            )
+
+        await ctx.send(embed=embed)
+
     # Coinflip
     @commands.command(name="coinflip", aliases=["flip"])
     async def coinflip(self, ctx):
@@ -215,56 +255,59 @@ class Misc(commands.Cog):
     # Help command
     @commands.command(name="help")
     async def help_custom(self, ctx):
-        embed = discord.Embed(title="🤖 Bot Help", description=f"Prefix: `{BOT_PREFIX}`", color=discord.Color.blue())
+        # The prefix is a per-guild setting, so show the one this command was invoked with
+        prefix = ctx.clean_prefix
+        embed = discord.Embed(title="🤖 Bot Help", description=f"Prefix: `{prefix}`", color=discord.Color.blue())
         
         # Level commands
         embed.add_field(
             name="🎮 Level Commands",
-            value=f"`{BOT_PREFIX}level [user]` - Show level\n"
-                  f"`{BOT_PREFIX}profile [user]` - Show profile card\n"
-                  f"`{BOT_PREFIX}leaderboard [limit]` - Show leaderboard",
+            value=f"`{prefix}level [user]` - Show level\n"
+                  f"`{prefix}profile [user]` - Show profile card\n"
+                  f"`{prefix}leaderboard [limit]` - Show leaderboard",
             inline=False
         )
         
         # Moderation commands
         embed.add_field(
             name="🛡️ Moderation Commands",
-            value=f"`{BOT_PREFIX}warn <user> [reason]` - Warn a user\n"
-                  f"`{BOT_PREFIX}listwarns <user>` - List warns for a user\n"
-                  f"`{BOT_PREFIX}clearwarns <user>` - Clear all warns\n"
-                  f"`{BOT_PREFIX}mute <user> <duration> [reason]` - Mute a user\n"
-                  f"`{BOT_PREFIX}unmute <user>` - Unmute a user\n"
-                  f"`{BOT_PREFIX}kick <user> [reason]` - Kick a user\n"
-                  f"`{BOT_PREFIX}ban <user> [days] [reason]` - Ban a user\n"
-                  f"`{BOT_PREFIX}purge <amount>` - Delete messages",
+            value=f"`{prefix}warn <user> [reason]` - Warn a user\n"
+                  f"`{prefix}listwarns <user>` - List warns for a user\n"
+                  f"`{prefix}clearwarns <user>` - Clear all warns\n"
+                  f"`{prefix}mute <user> <duration> [reason]` - Mute a user\n"
+                  f"`{prefix}unmute <user>` - Unmute a user\n"
+                  f"`{prefix}kick <user> [reason]` - Kick a user\n"
+                  f"`{prefix}ban <user> [days] [reason]` - Ban a user\n"
+                  f"`{prefix}purge <amount> [filters]` - Delete messages\n"
+                  f"`{prefix}config [key] [value]` - Server settings",
             inline=False
         )
         
         # XP Management commands
         embed.add_field(
             name="📊 XP Management Commands",
-            value=f"`{BOT_PREFIX}addxp <user> <amount>` - Add XP to a user\n"
-                  f"`{BOT_PREFIX}removexp <user> <amount>` - Remove XP from a user\n"
-                  f"`{BOT_PREFIX}setxp <user> <amount>` - Set a user's XP\n"
-                  f"`{BOT_PREFIX}resetxp <user>` - Reset a user's XP",
+            value=f"`{prefix}addxp <user> <amount>` - Add XP to a user\n"
+                  f"`{prefix}removexp <user> <amount>` - Remove XP from a user\n"
+                  f"`{prefix}setxp <user> <amount>` - Set a user's XP\n"
+                  f"`{prefix}resetxp <user>` - Reset a user's XP",
             inline=False
         )
         
         # Info commands
         embed.add_field(
             name="ℹ️ Info Commands",
-            value=f"`{BOT_PREFIX}userinfo [user]` - User information\n"
-                  f"`{BOT_PREFIX}serverinfo` - Server information\n"
-                  f"`{BOT_PREFIX}avatar [user]` - Get user avatar\n"
-                  f"`{BOT_PREFIX}ping` - Check bot latency",
+            value=f"`{prefix}userinfo [user]` - User information\n"
+                  f"`{prefix}serverinfo` - Server information\n"
+                  f"`{prefix}avatar [user]` - Get user avatar\n"
+                  f"`{prefix}ping` - Check bot latency",
             inline=False
         )
         
         # Fun commands
         embed.add_field(
             name="🎉 Fun Commands",
-            value=f"`{BOT_PREFIX}coinflip` - Flip a coin\n"
-                  f"`{BOT_PREFIX}8ball <question>` - Ask the magic 8ball",
+            value=f"`{prefix}coinflip` - Flip a coin\n"
+                  f"`{prefix}8ball <question>` - Ask the magic 8ball",
             inline=False
         )
         
@@ -5,10 +5,96 @@ from discord.ext import commands
 from discord.ext.commands import has_permissions, MissingPermissions
 import asyncio
 import datetime
+import re
+from utils.overwrites import OverwriteRollout
+from utils.purge import Purge, PurgeFilter
+from utils.settings import parse_duration, describe_step
+
+MUTED_OVERWRITE = discord.PermissionOverwrite(send_messages=False, speak=False, add_reactions=False, read_message_history=True)
+MUTE_ROLLOUT_CONCURRENCY = 5
+PURGE_MAX_SCAN = 50000
+
+
+class PurgeFlags(commands.FlagConverter):
+    """Filters for .purge, e.g. `.purge 500 user: @raider links: yes since: 2h`"""
+    user: discord.User = None
+    bots: bool = False
+    match: str = None
+    attachments: bool = False
+    links: bool = False
+    since: str = None
+    until: str = None
+
+
+class WarnHistoryView(discord.ui.View):
+    """Pages through a member's warn log with keyset cursors instead of OFFSET."""
+
+    PAGE_SIZE = 5
+
+    def __init__(self, db, settings, member: discord.Member, warns: int, author_id: int):
+        super().__init__(timeout=180)
+        self.db = db
+        self.settings = settings
+        self.member = member
+        self.warns = warns
+        self.author_id = author_id
+        self.cursors = [None]  # `before` cursor of every page we've walked through
+        self.rows = []
+        self.has_older = False
+
+    async def load(self):
+        rows = await self.db.get_warn_history(self.member.id, self.member.guild.id, self.PAGE_SIZE + 1, self.cursors[-1])
+        self.has_older = len(rows) > self.PAGE_SIZE
+        self.rows = rows[:self.PAGE_SIZE]
+        self.newer.disabled = len(self.cursors) == 1
+        self.older.disabled = not self.has_older
+
+    def build_embed(self) -> discord.Embed:
+        embed = discord.Embed(title=f"Warns for {self.member.display_name}", color=discord.Color.orange())
+        embed.add_field(name="Total Warns", value=self.warns, inline=False)
+
+        # Show warn actions
+        step = self.settings.warn_step(self.warns)
+        if step:
+            embed.add_field(name="Next Action", value=describe_step(step), inline=False)
+
+        if self.rows:
+            lines = []
+            for _, moderator_id, reason, created_at in self.rows:
+                by = f"<@{moderator_id}>" if moderator_id else "unknown"
+                # Keep the field under Discord's 1024-character limit
+                reason = (reason or "No reason provided")[:150]
+                lines.append(f"`{created_at.strftime('%Y-%m-%d %H:%M')}` by {by}: {reason}")
+            embed.add_field(name=f"History (page {len(self.cursors)})", value="\n".join(lines), inline=False)
+        else:
+            embed.add_field(name="History", value="No logged warns.", inline=False)
+
+        embed.set_thumbnail(url=self.member.display_avatar.url)
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+
+    @discord.ui.button(label="Newer", style=discord.ButtonStyle.secondary)
+    async def newer(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.pop()
+        await self.load()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="Older", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: discord.Interaction, button: discord.ui.Button):
+        _, _, _, created_at = self.rows[-1]
+        self.cursors.append((created_at, self.rows[-1][0]))
+        await self.load()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
 
 class Mod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._rollouts = {}  # guild_id -> (OverwriteRollout, task)
+        self._tasks = set()  # Strong refs so running rollouts aren't garbage collected
+        bot.scheduler.register("unmute", self.expire_mute)
 
     # ------------------- Kick -------------------
     @commands.command(name="kick")
@@ -75,33 +161,62 @@ class Mod(commands.Cog):
             # Create muted role if it doesn't exist
             try:
                 role = await guild.create_role(name="Muted", reason="Auto-created for mute")
-                
-                # Apply permissions to all channels
-                for channel in guild.channels:
-                    try:
-                        await channel.set_permissions(role, 
-                                                    send_messages=False, 
-                                                    speak=False, 
-                                                    add_reactions=False,
-                                                    read_message_history=True)
-                    except discord.Forbidden:
-                        continue  # Skip if we don't have permission for this channel
             except discord.Forbidden:
                 return False  # Can't create role
+
+        # Lock channels in the background. Channels that already match are skipped,
+        # so this resumes an unfinished rollout and is free once it has completed.
+        self.ensure_mute_overwrites(guild, role)
         
         # Add the role to the member
         try:
             await member.add_roles(role, reason=reason)
             
-            # Set a timer to remove the role
+            # Persist the unmute so it survives restarts and nothing waits on it
             if duration_seconds > 0:
-                await asyncio.sleep(duration_seconds)
-                if role in member.roles:
-                    await member.remove_roles(role, reason="Mute duration expired")
+                await self.bot.scheduler.cancel(guild.id, member.id, "unmute")
+                await self.bot.scheduler.schedule(guild.id, member.id, "unmute", duration_seconds, {"role_id": role.id})
             return True
         except discord.Forbidden:
             return False  # Can't add role to member
 
+    def ensure_mute_overwrites(self, guild, role):
+        """Start the Muted role's channel rollout, or join the one already running"""
+        entry = self._rollouts.get(guild.id)
+        if entry is None or entry[1].done():
+            rollout = OverwriteRollout(role, MUTED_OVERWRITE, concurrency=MUTE_ROLLOUT_CONCURRENCY, reason="Muted role setup")
+            task = asyncio.create_task(self._run_rollout(guild, rollout))
+            self._tasks.add(task)
+            task.add_done_callback(self._rollout_done)
+            entry = (rollout, task)
+            self._rollouts[guild.id] = entry
+        return entry
+
+    def _rollout_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"❌ Muted role rollout failed: {task.exception()!r}")
+
+    async def _run_rollout(self, guild, rollout):
+        report = await rollout.run(guild.channels)
+        if report.applied or report.failed:
+            print(f"🔇 Muted role rollout in {guild.name}: {report.summary()}")
+        return report
+
+    async def expire_mute(self, guild_id: int, user_id: int, payload):
+        """Scheduler handler: lift a role-based mute once it runs out"""
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        member = guild.get_member(user_id)
+        if member is None:
+            return  # Left the server
+        role = guild.get_role(payload["role_id"]) if payload else None
+        role = role or discord.utils.get(guild.roles, name="Muted")
+        if role and role in member.roles:
+            await member.remove_roles(role, reason="Mute duration expired")
+
     @commands.command(name="mute")
     @has_permissions(manage_roles=True)
     async def mute(self, ctx, member: discord.Member, duration: str, *, reason: str = "No reason provided"):
@@ -136,6 +251,30 @@ class Mod(commands.Cog):
         else:
             await ctx.send("❌ Failed to mute user. Check my permissions.")
 
+    @commands.command(name="mutesetup")
+    @has_permissions(manage_roles=True)
+    async def mutesetup(self, ctx):
+        """Create the Muted role if needed and lock it out of every channel"""
+        role = discord.utils.get(ctx.guild.roles, name="Muted")
+        try:
+            if role is None:
+                role = await ctx.guild.create_role(name="Muted", reason="Muted role setup")
+        except discord.Forbidden:
+            await ctx.send("❌ I don't have permission to create roles.")
+            return
+
+        rollout, task = self.ensure_mute_overwrites(ctx.guild, role)
+        msg = await ctx.send(f"🔧 Setting up {role.mention}…")
+        while not task.done():
+            await asyncio.wait({task}, timeout=2)
+            await msg.edit(content=f"🔧 {rollout.report.summary()}")
+
+        report = rollout.report
+        if report.failed:
+            failed = ", ".join(channel.mention for channel, _ in report.failed[:10])
+            more = f" (+{len(report.failed) - 10} more)" if len(report.failed) > 10 else ""
+            await ctx.send(f"⚠️ Couldn't update: {failed}{more}. Run `mutesetup` again to retry them.")
+
     # ------------------- Unmute -------------------
     @commands.command(name="unmute")
     @has_permissions(manage_roles=True)
@@ -154,6 +293,7 @@ class Mod(commands.Cog):
         if role and role in member.roles:
             try:
                 await member.remove_roles(role, reason="Manual unmute")
+                await self.bot.scheduler.cancel(ctx.guild.id, member.id, "unmute")
                 await ctx.send(f"✅ Unmuted {member.mention}")
             except discord.Forbidden:
                 await ctx.send("❌ I don't have permission to unmute this user.")
@@ -170,32 +310,40 @@ class Mod(commands.Cog):
             return
             
         db = self.bot.db
-        warns = await db.add_warn(member.id, ctx.guild.id)
+        max_warns = self.bot.settings.get(ctx.guild.id).max_warns
+        warns = await db.add_warn(member.id, ctx.guild.id, ctx.author.id, reason)
 
-        msg = f"⚠️ {member.mention} has been warned. Reason: {reason} (Warn {warns}/6)"
+        msg = f"⚠️ {member.mention} has been warned. Reason: {reason} (Warn {warns}/{max_warns})"
         await ctx.send(msg)
         try:
-            await member.send(f"⚠️ You have been warned in **{ctx.guild.name}**. Reason: {reason} (Warn {warns}/6)")
+            await member.send(f"⚠️ You have been warned in **{ctx.guild.name}**. Reason: {reason} (Warn {warns}/{max_warns})")
         except:
             pass
 
         # Actions based on warn count
-        if warns == 3:
-            await self.mute_member(ctx.guild, member, 3600, "3rd warn")
-        elif warns == 4:
-            await self.mute_member(ctx.guild, member, 86400, "4th warn")
-        elif warns == 5:
+        await self.apply_warn_step(ctx.guild, member, warns, ctx.send)
+
+    async def apply_warn_step(self, guild, member: discord.Member, warns: int, send, source: str = None):
+        """Run the guild's escalation-ladder step for this warn count, reporting through `send`"""
+        step = self.bot.settings.get(guild.id).warn_step(warns)
+        if step is None:
+            return
+        _, action, seconds = step
+        reason = f"{warns} warns" + (f" ({source})" if source else "")
+        if action == "mute":
+            await self.mute_member(guild, member, seconds, reason)
+        elif action == "kick":
             try:
-                await member.kick(reason="5th warn")
-                await ctx.send(f"✅ {member.mention} kicked due to 5 warns.")
+                await member.kick(reason=reason)
+                await send(f"✅ {member.mention} kicked due to {warns} warns.")
             except discord.Forbidden:
-                await ctx.send("❌ I don't have permission to kick this user.")
-        elif warns >= 6:
+                await send("❌ I don't have permission to kick this user.")
+        elif action == "ban":
             try:
-                await member.ban(reason="6th warn")
-                await ctx.send(f"⛔ {member.mention} banned due to 6 warns.")
+                await member.ban(reason=reason)
+                await send(f"⛔ {member.mention} banned due to {warns} warns.")
             except discord.Forbidden:
-                await ctx.send("❌ I don't have permission to ban this user.")
+                await send("❌ I don't have permission to ban this user.")
 
     # ------------------- List Warns -------------------
     @commands.command(name="listwarns", aliases=["warns"])
@@ -203,16 +351,9 @@ class Mod(commands.Cog):
     async def listwarns(self, ctx, member: discord.Member):
         """List warns for a member"""
         warns = await self.bot.db.get_warns(member.id, ctx.guild.id)
-        embed = discord.Embed(title=f"Warns for {member.display_name}", color=discord.Color.orange())
-        embed.add_field(name="Total Warns", value=warns, inline=False)
-        
-        # Show warn actions
-        if warns >= 3:
-            action = "1-hour mute" if warns == 3 else "1-day mute" if warns == 4 else "Kick" if warns == 5 else "Ban"
-            embed.add_field(name="Next Action", value=action, inline=False)
-            
-        embed.set_thumbnail(url=member.display_avatar.url)
-        await ctx.send(embed=embed)
+        view = WarnHistoryView(self.bot.db, self.bot.settings.get(ctx.guild.id), member, warns, ctx.author.id)
+        await view.load()
+        await ctx.send(embed=view.build_embed(), view=view)
 
     # ------------------- Clear Warns -------------------
     @commands.command(name="clearwarns", aliases=["resetwarns"])
@@ -225,26 +366,67 @@ class Mod(commands.Cog):
     # ------------------- Purge Messages -------------------
     @commands.command(name="purge")
     @has_permissions(manage_messages=True)
-    async def purge(self, ctx, amount: int):
-        """Delete multiple messages"""
+    async def purge(self, ctx, amount: int, *, flags: PurgeFlags):
+        """Scan the last N messages and delete those matching the filters (user: bots: match: attachments: links: since: until:)"""
         if amount <= 0:
             await ctx.send("❌ Amount must be positive.")
             return
-        
-        if amount > 100:
-            amount = 100
-        
+
+        try:
+            purge = self.build_purge(ctx.channel, amount, ctx.message, flags.user, flags.bots, flags.match,
+                                     flags.attachments, flags.links, flags.since, flags.until)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
         # Delete the command message first
         await ctx.message.delete()
-        
-        # Delete the specified number of messages
-        deleted = await ctx.channel.purge(limit=amount)
-        
+
+        status = None
+
+        async def report(text):
+            nonlocal status
+            if status is None:
+                status = await ctx.send(text)
+            else:
+                await status.edit(content=text)
+
+        result = await self.run_purge(purge, report)
+        if status is not None:
+            await status.delete()
+
         # Send confirmation message that auto-deletes
-        msg = await ctx.send(f"✅ Deleted {len(deleted)} messages.")
+        msg = await ctx.send(f"✅ {result.summary()}")
         await asyncio.sleep(5)
         await msg.delete()
 
+    def build_purge(self, channel, amount, before, user, bots, match, attachments, links, since, until):
+        """Turn command options into a Purge. Raises ValueError with a user-facing message."""
+        now = discord.utils.utcnow()
+        try:
+            after = now - datetime.timedelta(seconds=parse_duration(since)) if since else None
+            if until:
+                before = now - datetime.timedelta(seconds=parse_duration(until))
+        except ValueError:
+            raise ValueError("Invalid duration format. Use like: 10m, 1h, 2d")
+        try:
+            check = PurgeFilter([user.id] if user else None, bots, match, attachments, links)
+        except re.error as e:
+            raise ValueError(f"Invalid regex: {e}")
+        return Purge(channel, check, limit=min(amount, PURGE_MAX_SCAN), before=before, after=after)
+
+    async def run_purge(self, purge, report):
+        """Run a purge, passing a progress line to `report` every few seconds"""
+        task = asyncio.create_task(purge.run())
+        while not task.done():
+            await asyncio.wait({task}, timeout=3)
+            if not task.done():
+                try:
+                    await report(f"🧹 {purge.result.summary()}…")
+                except discord.HTTPException:
+                    pass  # Progress is best effort
+        return task.result()
+
     # ------------------- Error Handlers -------------------
     @kick.error
     @ban.error
@@ -254,6 +436,7 @@ class Mod(commands.Cog):
     @listwarns.error
     @clearwarns.error
     @purge.error
+    @mutesetup.error
     async def perm_error(self, ctx, error):
         if isinstance(error, MissingPermissions):
             await ctx.send("❌ You don't have permission to use this command.")
@@ -273,32 +456,18 @@ class Mod(commands.Cog):
             return
             
         db = self.bot.db
-        warns = await db.add_warn(member.id, interaction.guild.id)
+        max_warns = self.bot.settings.get(interaction.guild.id).max_warns
+        warns = await db.add_warn(member.id, interaction.guild.id, interaction.user.id, reason)
 
-        msg = f"⚠️ {member.mention} has been warned. Reason: {reason} (Warn {warns}/6)"
+        msg = f"⚠️ {member.mention} has been warned. Reason: {reason} (Warn {warns}/{max_warns})"
         await interaction.followup.send(msg)
 
         try:
-            await member.send(f"⚠️ You have been warned in **{interaction.guild.name}**. Reason: {reason} (Warn {warns}/6)")
+            await member.send(f"⚠️ You have been warned in **{interaction.guild.name}**. Reason: {reason} (Warn {warns}/{max_warns})")
         except:
             pass
 
-        if warns == 3:
-            await self.mute_member(interaction.guild, member, 3600, "3rd warn")
-        elif warns == 4:
-            await self.mute_member(interaction.guild, member, 86400, "4th warn")
-        elif warns == 5:
-            try:
-                await member.kick(reason="5th warn")
-                await interaction.followup.send(f"✅ {member.mention} kicked due to 5 warns.")
-            except discord.Forbidden:
-                await interaction.followup.send("❌ I don't have permission to kick this user.")
-        elif warns >= 6:
-            try:
-                await member.ban(reason="6th warn")
-                await interaction.followup.send(f"⛔ {member.mention} banned due to 6 warns.")
-            except discord.Forbidden:
-                await interaction.followup.send("❌ I don't have permission to ban this user.")
+        await self.apply_warn_step(interaction.guild, member, warns, interaction.followup.send)
 
     @warn_slash.error
     async def slash_perm_error(self, interaction: discord.Interaction, error):
@@ -359,6 +528,7 @@ class Mod(commands.Cog):
         if role and role in member.roles:
             try:
                 await member.remove_roles(role, reason="Manual unmute")
+                await self.bot.scheduler.cancel(interaction.guild.id, member.id, "unmute")
                 await interaction.followup.send(f"✅ Unmuted {member.mention}")
             except discord.Forbidden:
                 await interaction.followup.send("❌ I don't have permission to unmute this user.")
@@ -372,16 +542,9 @@ class Mod(commands.Cog):
         await interaction.response.defer()
         
         warns = await self.bot.db.get_warns(member.id, interaction.guild.id)
-        embed = discord.Embed(title=f"Warns for {member.display_name}", color=discord.Color.orange())
-        embed.add_field(name="Total Warns", value=warns, inline=False)
-        
-        # Show warn actions
-        if warns >= 3:
-            action = "1-hour mute" if warns == 3 else "1-day mute" if warns == 4 else "Kick" if warns == 5 else "Ban"
-            embed.add_field(name="Next Action", value=action, inline=False)
-            
-        embed.set_thumbnail(url=member.display_avatar.url)
-        await interaction.followup.send(embed=embed)
+        view = WarnHistoryView(self.bot.db, self.bot.settings.get(interaction.guild.id), member, warns, interaction.user.id)
+        await view.load()
+        await interaction.followup.send(embed=view.build_embed(), view=view)
 
     @app_commands.command(name="clearwarns", description="Clear all warns for a member")
     @app_commands.checks.has_permissions(manage_messages=True)
@@ -436,26 +599,37 @@ class Mod(commands.Cog):
         except discord.Forbidden:
             await interaction.followup.send("❌ I don't have permission to ban this user.")
 
-    @app_commands.command(name="purge", description="Delete multiple messages")
+    @app_commands.command(name="purge", description="Delete recent messages, optionally filtered")
     @app_commands.checks.has_permissions(manage_messages=True)
-    @app_commands.describe(amount="Number of messages to delete (max 100)")
-    async def purge_slash(self, interaction: discord.Interaction, amount: int):
-        await interaction.response.defer()
+    @app_commands.describe(amount=f"Number of recent messages to scan (max {PURGE_MAX_SCAN})",
+                           user="Only messages from this user", bots="Only messages from bots",
+                           match="Only messages matching this regex", attachments="Only messages with attachments",
+                           links="Only messages with links", since="Only messages newer than this (e.g. 2h)",
+                           until="Only messages older than this (e.g. 10m)")
+    async def purge_slash(self, interaction: discord.Interaction, amount: int, user: discord.User = None,
+                          bots: bool = False, match: str = None, attachments: bool = False, links: bool = False,
+                          since: str = None, until: str = None):
+        # Ephemeral, so the response itself never shows up in the history being purged
+        await interaction.response.defer(ephemeral=True)
         
         if amount <= 0:
             await interaction.followup.send("❌ Amount must be positive.")
             return
-        
-        if amount > 100:
-            amount = 100
-        
-        # Delete the specified number of messages
-        deleted = await interaction.channel.purge(limit=amount)
-        
-        # Send confirmation message that auto-deletes
-        msg = await interaction.followup.send(f"✅ Deleted {len(deleted)} messages.")
-        await asyncio.sleep(5)
-        await msg.delete()
+
+        try:
+            purge = self.build_purge(interaction.channel, amount, None, user, bots, match, attachments, links, since, until)
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}")
+            return
+
+        async def report(text):
+            await interaction.edit_original_response(content=text)
+
+        result = await self.run_purge(purge, report)
+        try:
+            await interaction.edit_original_response(content=f"✅ {result.summary()}")
+        except discord.HTTPException:
+            pass  # Interaction token expired during a very long purge
 
 async def setup(bot):
     await bot.add_cog(Mod(bot))
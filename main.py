@@ -1,9 +1,16 @@
 import os
-import time
 import asyncio
+import aiohttp
 import discord
 from discord.ext import commands
 from utils.db import Database
+from utils.cooldowns import TTLStores
+from utils.spam import SpamDetector, REPEAT
+from utils.pipeline import EventPipeline
+from utils.scheduler import Scheduler
+from utils.settings import SettingsCache, SETTINGS, MAX_SPAM_THRESHOLD
+from utils.render_service import RenderService
+from utils.avatars import AvatarCache
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,24 +21,42 @@ intents.message_content = True
 intents.members = True
 intents.reactions = True
 
-BOT_PREFIX = "."
-bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents, help_command=None)
+# Prefix, XP rate, cooldowns, spam threshold and the warn ladder are per-guild
+# settings (see utils/settings.py); the defaults live in SETTINGS.
+BOT_PREFIX = SETTINGS["prefix"].default
 
-# XP cooldown tracker
-_message_cooldowns = {}
-XP_PER_MESSAGE = 15  # Updated to 15 XP per message
-XP_COOLDOWN = 60
 
-# Spam tracker
-_spam_tracker = {}
-SPAM_THRESHOLD = 5
+def get_prefix(bot, message):
+    if message.guild is None:
+        return BOT_PREFIX
+    return bot.settings.get(message.guild.id).prefix
 
-# Level up cooldown
-_levelup_cooldowns = {}
-LEVELUP_COOLDOWN = 300  # 5 minutes
+
+bot = commands.Bot(command_prefix=get_prefix, intents=intents, help_command=None)
+
+# XP and level-up cooldown trackers, one store per cooldown length (see utils/cooldowns.py)
+_message_cooldowns = TTLStores()
+_levelup_cooldowns = TTLStores()
+
+# Spam detector: spam_threshold copies of a message within 2 minutes, or 10 messages within 10 seconds
+SPAM_RATE_LIMIT = 10
+SPAM_RATE_WINDOW = 10
+_spam_detector = SpamDetector(repeat_threshold=SETTINGS["spam_threshold"].default, rate_limit=SPAM_RATE_LIMIT,
+                              rate_window=SPAM_RATE_WINDOW, max_repeat_threshold=MAX_SPAM_THRESHOLD)
+
+# Message side-effect pipeline
+PIPELINE_WORKERS = 4
+PIPELINE_QUEUE_SIZE = 1000
+
+# Image rendering pool: RENDER_EXECUTOR=thread|process, RENDER_WORKERS (default: one per core)
+RENDER_MAX_IN_FLIGHT = 8
+RENDER_QUEUE_TIMEOUT = 10
+
+# Decoded avatars kept in memory; set AVATAR_CACHE_DIR to also keep downloads on disk
+AVATAR_CACHE_BYTES = 32 * 1024 * 1024
 
 # Load all cogs
-INITIAL_EXTENSIONS = ["cogs.mods", "cogs.levels", "cogs.misc"]
+INITIAL_EXTENSIONS = ["cogs.mods", "cogs.levels", "cogs.misc", "cogs.config"]
 
 # ----------------- EVENTS -----------------
 @bot.event
@@ -45,6 +70,14 @@ async def on_ready():
     except Exception as e:
         print("❌ Sync error:", e)
 
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    await bot.settings.fetch(guild.id)
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    bot.settings.forget(guild.id)
+
 @bot.event
 async def on_message(message: discord.Message):
     if message.author.bot or message.guild is None:
@@ -52,76 +85,61 @@ async def on_message(message: discord.Message):
 
     guild_id = message.guild.id
     user_id = message.author.id
-    key = (guild_id, user_id)
-    content = message.content.lower().strip()
+    settings = bot.settings.get(guild_id)
 
-    # ---------------- XP ----------------
-    now = time.time()
-    last = _message_cooldowns.get(key, 0)
-    if now - last >= XP_COOLDOWN:
-        try:
-            await bot.db.add_xp(user_id, guild_id, XP_PER_MESSAGE)
-            
-            # Check for level up
-            xp = await bot.db.get_user(user_id, guild_id)
-            level = bot.db.xp_to_level(xp)
-            prev_level = bot.db.xp_to_level(xp - XP_PER_MESSAGE)
-            
-            if level > prev_level:
-                # Level up! Check cooldown
-                last_levelup = _levelup_cooldowns.get(key, 0)
-                if now - last_levelup >= LEVELUP_COOLDOWN:
-                    _levelup_cooldowns[key] = now
-                    levels_cog = bot.get_cog("Levels")
-                    if levels_cog:
-                        await levels_cog.send_level_up_message(message.channel, message.author, level)
-                    
-        except Exception as e:
-            print(f"XP Error: {e}")
-        _message_cooldowns[key] = now
-
-    # ---------------- Spam ----------------
-    last_msg, count = _spam_tracker.get(key, ("", 0))
-    if content == last_msg:
-        count += 1
-    else:
-        count = 1
-    _spam_tracker[key] = (content, count)
-
-    if count >= SPAM_THRESHOLD:
-        try:
-            warns = await bot.db.add_warn(user_id, guild_id)
-            await message.channel.send(f"⚠️ {message.author.mention} auto-warned for spamming! ({warns}/6)")
-            try:
-                await message.author.send(f"⚠️ Auto-warned in {message.guild.name}! ({warns}/6)")
-            except:
-                pass
-
-            mod_cog = bot.get_cog("Mod")
-            if mod_cog:
-                if warns == 3:
-                    await mod_cog.mute_member(message.guild, message.author, 3600, "3rd warn (spam)")
-                elif warns == 4:
-                    await mod_cog.mute_member(message.guild, message.author, 86400, "4th warn (spam)")
-                elif warns == 5:
-                    try:
-                        await message.author.kick(reason="5th warn (spam)")
-                        await message.channel.send(f"✅ {message.author.mention} kicked due to 5 warns.")
-                    except discord.Forbidden:
-                        await message.channel.send("❌ I don't have permission to kick this user.")
-                elif warns >= 6:
-                    try:
-                        await message.author.ban(reason="6th warn (spam)")
-                        await message.channel.send(f"⛔ {message.author.mention} banned due to 6 warns.")
-                    except discord.Forbidden:
-                        await message.channel.send("❌ I don't have permission to ban this user.")
-
-            _spam_tracker[key] = ("", 0)
-        except Exception as e:
-            print(f"Spam detection error: {e}")
+    # Side effects run on the pipeline workers; only O(1) in-memory checks happen here
+    cooldowns = _message_cooldowns[settings.xp_cooldown]
+    if not cooldowns.active(guild_id, user_id):
+        cooldowns.touch(guild_id, user_id)
+        bot.pipeline.submit(("xp", guild_id, user_id), lambda: handle_xp(message), droppable=True)
+
+    spam = _spam_detector.check(guild_id, user_id, message.content, settings.spam_threshold)
+    if spam:
+        _spam_detector.reset(guild_id, user_id)
+        bot.pipeline.submit(("spam", guild_id, user_id), lambda: handle_spam(message, spam))
 
     await bot.process_commands(message)
 
+# ----------------- MESSAGE SIDE EFFECTS -----------------
+async def handle_xp(message: discord.Message):
+    guild_id = message.guild.id
+    user_id = message.author.id
+    settings = bot.settings.get(guild_id)
+    try:
+        # Write-behind: levels come from the in-memory ranking, the row is flushed later
+        _, _, prev_level, level = await bot.db.add_xp(user_id, guild_id, settings.xp_per_message)
+        
+        if level > prev_level:
+            # Level up! Check cooldown
+            cooldowns = _levelup_cooldowns[settings.levelup_cooldown]
+            if not cooldowns.active(guild_id, user_id):
+                cooldowns.touch(guild_id, user_id)
+                levels_cog = bot.get_cog("Levels")
+                if levels_cog:
+                    await levels_cog.send_level_up_message(message.channel, message.author, level)
+                
+    except Exception as e:
+        print(f"XP Error: {e}")
+
+async def handle_spam(message: discord.Message, spam: str):
+    guild_id = message.guild.id
+    user_id = message.author.id
+    try:
+        kind = "repeated messages" if spam == REPEAT else "message flood"
+        max_warns = bot.settings.get(guild_id).max_warns
+        warns = await bot.db.add_warn(user_id, guild_id, bot.user.id, f"Spam: {kind} (auto-warn)")
+        await message.channel.send(f"⚠️ {message.author.mention} auto-warned for spamming ({kind})! ({warns}/{max_warns})")
+        try:
+            await message.author.send(f"⚠️ Auto-warned in {message.guild.name}! ({warns}/{max_warns})")
+        except:
+            pass
+
+        mod_cog = bot.get_cog("Mod")
+        if mod_cog:
+            await mod_cog.apply_warn_step(message.guild, message.author, warns, message.channel.send, "spam")
+    except Exception as e:
+        print(f"Spam detection error: {e}")
+
 # ----------------- EXTENSIONS -----------------
 async def load_extensions():
     for ext in INITIAL_EXTENSIONS:
@@ -136,15 +154,45 @@ async def main():
     # DB setup
     bot.db = Database()
     await bot.db.connect()
-    await bot.db.create_tables()
-    print("🔗 Database connected and tables created.")
-
+    applied = await bot.db.migrate()
+    if applied:
+        print(f"🧱 Applied schema migrations: {', '.join(map(str, applied))}")
+    print("🔗 Database connected and schema up to date.")
+
+    bot.settings = SettingsCache(bot.db)
+    await bot.settings.load_all()
+
+    bot.pipeline = EventPipeline(workers=PIPELINE_WORKERS, maxsize=PIPELINE_QUEUE_SIZE)
+    bot.pipeline.start()
+
+    bot.renderer = RenderService(
+        os.getenv("RENDER_EXECUTOR", "thread"),
+        workers=int(os.getenv("RENDER_WORKERS", "0")) or None,
+        max_in_flight=RENDER_MAX_IN_FLIGHT,
+        queue_timeout=RENDER_QUEUE_TIMEOUT,
+    )
+
+    # One HTTP client for the whole bot, so downloads reuse connections
+    bot.session = aiohttp.ClientSession()
+    bot.avatars = AvatarCache(bot.session, bot.renderer, AVATAR_CACHE_BYTES, os.getenv("AVATAR_CACHE_DIR"))
+
+    # Cogs register their scheduled-action handlers while loading
+    bot.scheduler = Scheduler(bot.db)
     await load_extensions()
+    await bot.scheduler.start()
 
     TOKEN = os.getenv("DISCORD_TOKEN")
     if not TOKEN:
         raise RuntimeError("DISCORD_TOKEN missing.")
-    await bot.start(TOKEN)
+    try:
+        await bot.start(TOKEN)
+    finally:
+        # Finish queued side effects, then flush buffered XP before the process exits
+        await bot.pipeline.stop()
+        await bot.scheduler.stop()
+        await bot.session.close()
+        bot.renderer.close()
+        await bot.db.close()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,160 @@
+"""
+Avatar cache for card and leaderboard rendering.
+
+Avatars are keyed by (asset key, size). The asset key is Discord's avatar
+hash, so it changes whenever the user changes their avatar and a stale entry
+can never be served. Downloads go through the bot-wide aiohttp session and
+request the smallest CDN variant that covers the size we draw (e.g. 256px for
+the 250px card avatar) instead of the full-size image.
+
+Two tiers:
+- memory: an LRU of decoded, resized and circle-masked RGBA images, bounded
+  by a byte budget (width * height * 4 per entry);
+- disk (optional): the downloaded bytes under `disk_dir`, so a restart does
+  not refetch every avatar.
+
+Decoding and masking run on the render service, like the rest of the Pillow
+work. Concurrent requests for the same avatar share one download, at most
+`max_downloads` downloads run at once, and each one gives up after
+`request_timeout` seconds.
+
+get_many() fetches a batch (e.g. every leaderboard row) concurrently and stops
+waiting at a deadline; stragglers come back as None so the caller can draw a
+placeholder, and keep downloading in the background to be cached next time.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+
+import aiohttp
+
+from utils import render
+
+
+def cdn_size(size: int) -> int:
+    """Smallest size the Discord CDN serves (a power of two, 16-4096) that is at least `size`."""
+    cdn = 16
+    while cdn < size and cdn < 4096:
+        cdn *= 2
+    return cdn
+
+
+class AvatarCache:
+    def __init__(self, session, renderer, max_bytes: int = 32 * 1024 * 1024, disk_dir: str = None,
+                 max_downloads: int = 20, request_timeout: float = 5.0):
+        self.session = session
+        self.renderer = renderer
+        self.max_bytes = max_bytes
+        self._downloads = asyncio.Semaphore(max_downloads)
+        self._timeout = aiohttp.ClientTimeout(total=request_timeout)
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._images = OrderedDict()
+        self._pending = {}
+        self.bytes = 0
+
+        # Metrics
+        self.hits = 0
+        self.disk_hits = 0
+        self.downloads = 0
+        self.failures = 0
+        self.evictions = 0
+        self.late = 0
+
+    async def get(self, asset, size: int):
+        """Masked RGBA avatar of `size` px for a discord Asset, or None if it can't be fetched."""
+        key = (asset.key, size)
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+            self.hits += 1
+            return image
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(self._load(asset, size))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def get_many(self, assets, size: int, deadline: float = 2.0):
+        """Fetch avatars for several assets at once. Entries for None assets, failures and
+        downloads still running after `deadline` seconds are None."""
+        tasks = [asyncio.ensure_future(self.get(asset, size)) if asset is not None else None for asset in assets]
+        running = [task for task in tasks if task is not None]
+        if running:
+            await asyncio.wait(running, timeout=deadline)
+        images = []
+        for task in tasks:
+            if task is not None and task.done():
+                images.append(task.result())
+            else:
+                if task is not None:
+                    self.late += 1  # Left running; the result lands in the cache
+                images.append(None)
+        return images
+
+    async def _load(self, asset, size: int):
+        key = (asset.key, size)
+        path = os.path.join(self.disk_dir, f"{asset.key}_{cdn_size(size)}") if self.disk_dir else None
+        try:
+            raw = await asyncio.to_thread(_read_file, path) if path else None
+            if raw is not None:
+                self.disk_hits += 1
+            else:
+                async with self._downloads:
+                    async with self.session.get(asset.with_size(cdn_size(size)).url, timeout=self._timeout) as resp:
+                        resp.raise_for_status()
+                        raw = await resp.read()
+                self.downloads += 1
+                if path:
+                    await asyncio.to_thread(_write_file, path, raw)
+            image = await self.renderer.run(render.prepare_avatar, raw, size)
+        except Exception as e:
+            self.failures += 1
+            print(f"Avatar error: {e}")
+            return None
+
+        self._store(key, image)
+        return image
+
+    def _store(self, key, image):
+        cost = image.width * image.height * 4
+        if cost > self.max_bytes:
+            return
+        self._images[key] = image
+        self.bytes += cost
+        while self.bytes > self.max_bytes:
+            _, old = self._images.popitem(last=False)
+            self.bytes -= old.width * old.height * 4
+            self.evictions += 1
+
+    def metrics(self) -> dict:
+        return {
+            "entries": len(self._images),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "downloads": self.downloads,
+            "failures": self.failures,
+            "evictions": self.evictions,
+            "late": self.late,
+        }
+
+
+def _read_file(path: str):
+    try:
+        with open(path, "rb") as fp:
+            return fp.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_file(path: str, data: bytes):
+    # Write then rename, so a crash never leaves a truncated avatar behind
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(data)
+    os.replace(tmp, path)
@@ -0,0 +1,169 @@
+"""
+TTL-evicting per-member state for cooldowns and trackers.
+
+A TTLStore remembers when each (guild_id, user_id) was last touched and
+forgets it `ttl` seconds later, so the store is bounded by the number of
+members active within one ttl instead of growing forever.
+
+Entries live in an open-addressing hash table made of three flat arrays
+(guild ids, user ids, expiry times), so an entry is 24 raw bytes with no
+Python objects behind it. A plain dict of the same data costs several times
+that in key, value and table overhead. Expired entries are swept out whenever
+the table fills up to 2/3: the sweep rebuilds it with only live entries,
+sized for at most 1/2 load, so the next sweep is at least a third of the live
+count of inserts away and eviction stays amortized O(1). Values are only stored for entries
+that carry one (plain cooldowns just use touch()).
+
+When the ttl differs per guild, TTLStores keeps one TTLStore per distinct ttl.
+"""
+
+import time
+from array import array
+
+# Expiry values that mark a slot as never used, or freed by discard().
+# Real expiries are clock + ttl, which is never negative.
+EMPTY = -2.0
+DELETED = -1.0
+MIN_CAPACITY = 8
+
+
+def pack_key(guild_id: int, user_id: int) -> int:
+    # Snowflakes fit in 64 bits
+    return (guild_id << 64) | user_id
+
+
+class TTLStore:
+    def __init__(self, ttl: float, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._values = {}
+        self._size = 0  # Slots holding an entry, expired or not
+        self._used = 0  # Slots holding an entry or a DELETED marker
+        self._allocate(MIN_CAPACITY)
+        self.evictions = 0
+
+    def __len__(self):
+        return self._size
+
+    def _allocate(self, capacity: int):
+        self._mask = capacity - 1
+        self._guilds = array("Q", bytes(8 * capacity))
+        self._users = array("Q", bytes(8 * capacity))
+        self._times = array("d", [EMPTY]) * capacity
+
+    def _find(self, guild_id: int, user_id: int) -> int:
+        """Slot holding the member, or -1."""
+        mask, times, guilds, users = self._mask, self._times, self._guilds, self._users
+        i = hash((guild_id, user_id)) & mask
+        while True:
+            expires = times[i]
+            if expires == EMPTY:
+                return -1
+            if expires != DELETED and users[i] == user_id and guilds[i] == guild_id:
+                return i
+            i = (i + 1) & mask
+
+    def active(self, guild_id: int, user_id: int) -> bool:
+        i = self._find(guild_id, user_id)
+        return i >= 0 and self._times[i] > self._clock()
+
+    def get(self, guild_id: int, user_id: int, default=None):
+        i = self._find(guild_id, user_id)
+        if i < 0 or self._times[i] <= self._clock():
+            return default
+        return self._values.get(pack_key(guild_id, user_id), default)
+
+    def touch(self, guild_id: int, user_id: int):
+        """Start (or restart) the member's ttl without storing a value."""
+        self._put(guild_id, user_id)
+
+    def set(self, guild_id: int, user_id: int, value):
+        self._put(guild_id, user_id)
+        self._values[pack_key(guild_id, user_id)] = value
+
+    def discard(self, guild_id: int, user_id: int):
+        i = self._find(guild_id, user_id)
+        if i >= 0:
+            self._times[i] = DELETED
+            self._size -= 1
+            self._values.pop(pack_key(guild_id, user_id), None)
+
+    def _put(self, guild_id: int, user_id: int):
+        now = self._clock()
+        expires = now + self.ttl
+        i = self._find(guild_id, user_id)
+        if i >= 0:
+            if self._times[i] <= now and self._values:
+                # Expired but not swept yet: its old value is gone, as if it had been
+                self._values.pop(pack_key(guild_id, user_id), None)
+            self._times[i] = expires
+            return
+        if (self._used + 1) * 3 > (self._mask + 1) * 2:
+            self.evict_expired(now)
+        self._insert(guild_id, user_id, expires)
+
+    def _insert(self, guild_id: int, user_id: int, expires: float):
+        # Caller checked the member isn't present, so the first free slot will do
+        mask, times = self._mask, self._times
+        i = hash((guild_id, user_id)) & mask
+        while times[i] != EMPTY and times[i] != DELETED:
+            i = (i + 1) & mask
+        if times[i] == EMPTY:
+            self._used += 1
+        self._guilds[i] = guild_id
+        self._users[i] = user_id
+        times[i] = expires
+        self._size += 1
+
+    def evict_expired(self, now: float = None) -> int:
+        """Drop expired entries and rebuild the table at a size that fits the rest."""
+        if now is None:
+            now = self._clock()
+        guilds, users, times = self._guilds, self._users, self._times
+        live = []
+        for i in range(len(times)):
+            expires = times[i]
+            if expires > now:
+                live.append(i)
+            elif expires != EMPTY and expires != DELETED:
+                self._values.pop(pack_key(guilds[i], users[i]), None)
+        evicted = self._size - len(live)
+
+        capacity = MIN_CAPACITY
+        while capacity < 2 * (len(live) + 1):
+            capacity *= 2
+        self._allocate(capacity)
+        self._size = self._used = 0
+        for i in live:
+            self._insert(guilds[i], users[i], times[i])
+        self.evictions += evicted
+        return evicted
+
+    def metrics(self) -> dict:
+        return {
+            "size": self._size,
+            "capacity": self._mask + 1,
+            "evictions": self.evictions,
+        }
+
+
+class TTLStores:
+    """TTLStores keyed by ttl, for cooldowns whose length is a per-guild setting."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._stores = {}
+
+    def __getitem__(self, ttl: float) -> TTLStore:
+        store = self._stores.get(ttl)
+        if store is None:
+            store = self._stores[ttl] = TTLStore(ttl, clock=self._clock)
+        return store
+
+    def metrics(self) -> dict:
+        totals = {"size": 0, "capacity": 0, "evictions": 0}
+        for store in self._stores.values():
+            for name, value in store.metrics().items():
+                totals[name] += value
+        totals["stores"] = len(self._stores)
+        return totals
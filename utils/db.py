@@ -1,33 +1,259 @@
 """
 Database abstraction supporting SQLite (local) and Postgres (DATABASE_URL env).
 Provides simple tables for levels/XP and warns, with basic operations.
+The schema itself lives in utils/migrations.py.
 
 Usage:
 - Create Database() and call await connect()
-- await create_tables()
+- await migrate()
 - await add_xp(user_id, guild_id, amount)
+- await award_xp(user_id, guild_id, amount)
 - await get_user(user_id, guild_id)
 - await get_leaderboard(guild_id, limit)
+- await get_leaderboard_snapshot(guild_id, limit)
+- await get_rank(user_id, guild_id)
+- async for rows in export_xp(guild_id)
+- await import_xp(guild_id, batches, mode)
 - await set_xp(user_id, guild_id, xp)
 - await reset_user(user_id, guild_id)
-- await add_warn(user_id, guild_id)
+- await add_warn(user_id, guild_id, moderator_id, reason)
+- await get_warn_history(user_id, guild_id, limit, before)
 - await get_warns(user_id, guild_id)
 - await reset_warns(user_id, guild_id)
+- await add_scheduled_action(...) / get_scheduled_actions() / delete_scheduled_actions(ids)
+- await flush_xp()
+- await check_ranking(guild_id)
 - await close()
+
+add_xp() is write-behind: deltas are summed in memory per (guild_id, user_id)
+and written as one bulk upsert every flush_interval seconds or once
+flush_threshold users are pending. Reads merge the pending deltas, and
+close() flushes whatever is left. Message XP goes through add_xp(); award_xp()
+is a synchronous write for moderator commands that must hit the table at once.
+
+Leaderboard and rank reads are served from a per-guild GuildRanking that is
+loaded on first use and kept current by every XP write. Each ranking also
+keeps a snapshot of its top rows (get_leaderboard_snapshot) with a version
+that only changes when a write can actually change those rows.
 """
 
 import os
-import aiosqlite
+import time
+import asyncio
+import itertools
+import datetime
 import asyncpg
-import math
+from utils.sqlite_engine import SQLiteEngine
+from utils.migrations import migrate_sqlite, migrate_postgres
+from utils.level_curve import level_for
+from bisect import bisect_left, insort
+
+# Snapshot versions are unique across rankings, so a reloaded guild never reuses one
+_snapshot_versions = itertools.count(1)
+
+class XPBuffer:
+    """In-memory accumulator of XP deltas keyed by (guild_id, user_id)."""
 
-class Database:
     def __init__(self):
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, guild_id: int, user_id: int, amount: int):
+        key = (guild_id, user_id)
+        self._pending[key] = self._pending.get(key, 0) + amount
+
+    def get(self, guild_id: int, user_id: int) -> int:
+        return self._pending.get((guild_id, user_id), 0)
+
+    def discard(self, guild_id: int, user_id: int):
+        self._pending.pop((guild_id, user_id), None)
+
+    def drain(self):
+        """Return all pending (guild_id, user_id, delta) rows and clear the buffer."""
+        pending, self._pending = self._pending, {}
+        return [(g, u, d) for (g, u), d in pending.items() if d]
+
+    def restore(self, rows):
+        """Put rows from a failed flush back, merging with newer deltas."""
+        for guild_id, user_id, delta in rows:
+            self.add(guild_id, user_id, delta)
+
+    def for_guild(self, guild_id: int):
+        return [(u, d) for (g, u), d in self._pending.items() if g == guild_id and d]
+
+
+class GuildRanking:
+    """Order-statistic index over one guild's XP, sorted by (-xp, user_id).
+
+    Keys are kept in sublists of up to 2 * LOAD entries with a Fenwick tree over
+    the sublist lengths, so updates cost O(log n + LOAD) and rank lookups O(log n).
+
+    The top SNAPSHOT rows are kept as a snapshot. A write only marks it dirty
+    if it touches a user in the snapshot or sorts ahead of its last row; any
+    other write can't change the top rows and leaves the version alone.
+    """
+
+    LOAD = 256
+    SNAPSHOT = 20
+
+    def __init__(self, rows=()):
+        self._xp = {user_id: xp for user_id, xp in rows}
+        keys = sorted((-xp, user_id) for user_id, xp in self._xp.items())
+        self._lists = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [sub[-1] for sub in self._lists]
+        self._rebuild_tree()
+
+        # Top-rows snapshot; None while dirty
+        self._top = None
+        self._top_ids = frozenset()
+        self._top_floor = None
+        self.version = next(_snapshot_versions)
+
+    def __len__(self):
+        return len(self._xp)
+
+    def __contains__(self, user_id):
+        return user_id in self._xp
+
+    def get(self, user_id: int, default=None):
+        return self._xp.get(user_id, default)
+
+    def set(self, user_id: int, xp: int):
+        old = self._xp.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._delete((-old, user_id))
+        self._xp[user_id] = xp
+        self._insert((-xp, user_id))
+        self._touch(user_id, (-xp, user_id))
+
+    def add(self, user_id: int, delta: int):
+        self.set(user_id, self._xp.get(user_id, 0) + delta)
+
+    def remove(self, user_id: int):
+        old = self._xp.pop(user_id, None)
+        if old is not None:
+            self._delete((-old, user_id))
+            self._touch(user_id, None)
+
+    def rank(self, user_id: int) -> int:
+        """1 + number of users with strictly more XP (ties share a rank)."""
+        xp = self._xp.get(user_id, 0)
+        # User ids are non-negative, so (-xp, -1) sorts before every key with this XP
+        return self._count_before((-xp, -1)) + 1
+
+    def top(self, limit: int):
+        if limit <= self.SNAPSHOT:
+            return self.snapshot(limit)[1]
+        return self._scan(limit)
+
+    def snapshot(self, limit: int = SNAPSHOT):
+        """(version, top rows) for limit <= SNAPSHOT. The version changes whenever the rows do."""
+        if self._top is None:
+            self._top = self._scan(self.SNAPSHOT)
+            self._top_ids = frozenset(user_id for user_id, _ in self._top)
+            self._top_floor = (-self._top[-1][1], self._top[-1][0]) if len(self._top) == self.SNAPSHOT else None
+        return self.version, self._top[:limit]
+
+    def _touch(self, user_id: int, key):
+        """Mark the snapshot dirty if a write to user_id (new sort key, None = removed) can change it."""
+        if self._top is None:
+            return
+        if user_id in self._top_ids or (key is not None and (self._top_floor is None or key < self._top_floor)):
+            self._top = None
+            self.version = next(_snapshot_versions)
+
+    def _scan(self, limit: int):
+        rows = []
+        for sub in self._lists:
+            for neg_xp, user_id in sub:
+                if len(rows) >= limit:
+                    return rows
+                rows.append((user_id, -neg_xp))
+        return rows
+
+    # Fenwick tree over sublist lengths
+    def _rebuild_tree(self):
+        tree = [0] + [len(sub) for sub in self._lists]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, i: int, delta: int):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i: int) -> int:
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _insert(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._lists[i], key)
+        sub = self._lists[i]
+        if len(sub) > 2 * self.LOAD:
+            self._lists[i:i + 1] = [sub[:self.LOAD], sub[self.LOAD:]]
+            self._maxes[i:i + 1] = [sub[self.LOAD - 1], sub[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def _delete(self, key):
+        i = bisect_left(self._maxes, key)
+        sub = self._lists[i]
+        del sub[bisect_left(sub, key)]
+        if sub:
+            self._maxes[i] = sub[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+
+    def _count_before(self, key) -> int:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return len(self._xp)
+        return self._prefix(i) + bisect_left(self._lists[i], key)
+
+
+class Database:
+    def __init__(self, flush_interval: float = 5.0, flush_threshold: int = 500):
         self.database_url = os.getenv("DATABASE_URL")
         self._pg_pool = None
-        self._sqlite_conn = None
+        self._sqlite = None
         self._using_pg = False
 
+        # Write-behind XP buffer
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._xp_buffer = XPBuffer()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+
+        # Per-guild in-memory leaderboards, loaded lazily
+        self._rankings = {}
+
     async def connect(self):
         if self.database_url and self.database_url.startswith("postgres"):
             # Using Postgres
@@ -35,83 +261,145 @@ class Database:
             self._using_pg = True
             print("Using PostgreSQL database")
         else:
-            # Fallback to SQLite file
-            self._sqlite_conn = await aiosqlite.connect("levels.db")
-            await self._sqlite_conn.execute("PRAGMA journal_mode=WAL;")
-            await self._sqlite_conn.commit()
+            # Fallback to SQLite file: read-only WAL readers plus one group-committing writer
+            self._sqlite = SQLiteEngine("levels.db", readers=int(os.getenv("SQLITE_READERS", "4")))
+            await self._sqlite.open()
             self._using_pg = False
             print("Using SQLite database")
 
-    async def create_tables(self):
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def migrate(self):
+        """Bring the schema up to date; returns the migration versions applied."""
         if self._using_pg:
-            async with self._pg_pool.acquire() as conn:
-                # XP table
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS xp (
-                        guild_id BIGINT,
-                        user_id BIGINT,
-                        xp BIGINT DEFAULT 0,
-                        PRIMARY KEY (guild_id, user_id)
-                    );
-                """)
-                # Warn table
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS warns (
-                        guild_id BIGINT,
-                        user_id BIGINT,
-                        warns INTEGER DEFAULT 0,
-                        PRIMARY KEY (guild_id, user_id)
-                    );
-                """)
-        else:
-            # SQLite
-            await self._sqlite_conn.execute("""
-                CREATE TABLE IF NOT EXISTS xp (
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    xp INTEGER DEFAULT 0,
-                    PRIMARY KEY (guild_id, user_id)
-                );
-            """)
-            await self._sqlite_conn.execute("""
-                CREATE TABLE IF NOT EXISTS warns (
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    warns INTEGER DEFAULT 0,
-                    PRIMARY KEY (guild_id, user_id)
-                );
-            """)
-            await self._sqlite_conn.commit()
+            return await migrate_postgres(self._pg_pool)
+        return await migrate_sqlite(self._sqlite)
 
     # ---------------- XP helpers ----------------
     async def add_xp(self, user_id: int, guild_id: int, amount: int = 1):
-        if self._using_pg:
-            async with self._pg_pool.acquire() as conn:
-                await conn.execute("""
-                    INSERT INTO xp (guild_id, user_id, xp) VALUES ($1, $2, $3)
-                    ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = xp + $3;
-                """, guild_id, user_id, amount)
-        else:
-            async with self._sqlite_conn.execute("SELECT xp FROM xp WHERE guild_id=? AND user_id=?", (guild_id, user_id)) as cur:
-                row = await cur.fetchone()
-            if row is None:
-                await self._sqlite_conn.execute("INSERT INTO xp (guild_id, user_id, xp) VALUES (?, ?, ?)", (guild_id, user_id, amount))
+        """Queue an XP delta; it is written on the next flush.
+
+        Returns (old_xp, new_xp, old_level, new_level), read from the guild's
+        in-memory ranking, which already includes every pending delta.
+        """
+        ranking = await self._get_ranking(guild_id)
+        # No await between reading the ranking and updating it, so no other write can land in between
+        old_xp = ranking.get(user_id, 0)
+        self._xp_buffer.add(guild_id, user_id, amount)
+        ranking.add(user_id, amount)
+        new_xp = ranking.get(user_id)
+        if len(self._xp_buffer) >= self.flush_threshold:
+            await self.flush_xp()
+        return old_xp, new_xp, self.xp_to_level(old_xp), self.xp_to_level(new_xp)
+
+    async def award_xp(self, user_id: int, guild_id: int, amount: int):
+        """Atomically add XP (or remove it, with a negative amount) and report the change.
+
+        Returns (old_xp, new_xp, old_level, new_level). XP never drops below 0.
+        Any buffered delta for the user is folded into the same statement.
+        """
+        # Hold the flush lock, like set_xp, so a flush that already drained this user's
+        # delta but hasn't committed it can't slip between the buffer read and the upsert
+        async with self._flush_lock:
+            pending = self._xp_buffer.get(guild_id, user_id)
+            self._xp_buffer.discard(guild_id, user_id)
+            delta = amount + pending
+            try:
+                # RETURNING only sees the new row (a sub-select of the old one runs after the
+                # upsert has changed it), so both backends derive the old value from the
+                # unclamped result and clamp afterwards in the same transaction.
+                if self._using_pg:
+                    async with self._pg_pool.acquire() as conn:
+                        async with conn.transaction():
+                            new_xp = await conn.fetchval("""
+                                INSERT INTO xp (guild_id, user_id, xp) VALUES ($1, $2, $3)
+                                ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = xp.xp + EXCLUDED.xp
+                                RETURNING xp;
+                            """, guild_id, user_id, delta)
+                            stored_old = new_xp - delta
+                            if new_xp < 0:
+                                await conn.execute("UPDATE xp SET xp=0 WHERE guild_id=$1 AND user_id=$2", guild_id, user_id)
+                                new_xp = 0
+                else:
+                    async def op(conn):
+                        async with conn.execute("""
+                            INSERT INTO xp (guild_id, user_id, xp) VALUES (?, ?, ?)
+                            ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = xp + excluded.xp
+                            RETURNING xp;
+                        """, (guild_id, user_id, delta)) as cur:
+                            row = await cur.fetchone()
+                        new_xp = row[0]
+                        if new_xp < 0:
+                            await conn.execute("UPDATE xp SET xp=0 WHERE guild_id=? AND user_id=?", (guild_id, user_id))
+                            return new_xp - delta, 0
+                        return new_xp - delta, new_xp
+
+                    stored_old, new_xp = await self._sqlite.write(op)
+            except Exception:
+                self._xp_buffer.add(guild_id, user_id, pending)
+                raise
+
+            # add_xp doesn't take the lock, so deltas may have been buffered during the upsert.
+            # They are already in the ranking and will be flushed, so keep them on top.
+            self._track_xp(guild_id, user_id, new_xp + self._xp_buffer.get(guild_id, user_id))
+            # Callers already saw the buffered delta through get_user, so count it as "old"
+            old_xp = stored_old + pending
+            return old_xp, new_xp, self.xp_to_level(old_xp), self.xp_to_level(new_xp)
+
+    async def flush_xp(self):
+        """Write all pending XP deltas as one bulk upsert."""
+        async with self._flush_lock:
+            await self._flush_pending()
+
+    async def _flush_pending(self):
+        # Caller must hold _flush_lock
+        rows = self._xp_buffer.drain()
+        if not rows:
+            return
+        try:
+            if self._using_pg:
+                guild_ids, user_ids, deltas = zip(*rows)
+                async with self._pg_pool.acquire() as conn:
+                    await conn.execute("""
+                        INSERT INTO xp (guild_id, user_id, xp)
+                        SELECT * FROM UNNEST($1::bigint[], $2::bigint[], $3::bigint[])
+                        ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = xp.xp + EXCLUDED.xp;
+                    """, list(guild_ids), list(user_ids), list(deltas))
             else:
-                new_xp = row[0] + amount
-                await self._sqlite_conn.execute("UPDATE xp SET xp=? WHERE guild_id=? AND user_id=?", (new_xp, guild_id, user_id))
-            await self._sqlite_conn.commit()
+                await self._sqlite.executemany("""
+                    INSERT INTO xp (guild_id, user_id, xp) VALUES (?, ?, ?)
+                    ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = xp + excluded.xp;
+                """, rows)
+        except Exception:
+            self._xp_buffer.restore(rows)
+            raise
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_xp()
+            except Exception as e:
+                print(f"XP flush error: {e}")
 
     async def get_user(self, user_id: int, guild_id: int):
-        if self._using_pg:
-            async with self._pg_pool.acquire() as conn:
-                row = await conn.fetchrow("SELECT xp FROM xp WHERE guild_id=$1 AND user_id=$2", guild_id, user_id)
-                return row["xp"] if row else 0
-        else:
-            async with self._sqlite_conn.execute("SELECT xp FROM xp WHERE guild_id=? AND user_id=?", (guild_id, user_id)) as cur:
-                row = await cur.fetchone()
-                return row[0] if row else 0
+        """Return the user's XP including deltas not flushed yet.
+
+        Served from the guild's ranking, which every write updates before it
+        awaits anything. Reading the table and adding the buffer instead would
+        miss deltas that a flush has drained but not committed yet.
+        """
+        ranking = await self._get_ranking(guild_id)
+        return ranking.get(user_id, 0)
 
     async def set_xp(self, user_id: int, guild_id: int, xp: int):
+        # Hold the flush lock so an in-flight flush can't re-apply an old delta on top
+        async with self._flush_lock:
+            self._xp_buffer.discard(guild_id, user_id)
+            await self._set_xp(user_id, guild_id, xp)
+            self._track_xp(guild_id, user_id, xp)
+
+    async def _set_xp(self, user_id: int, guild_id: int, xp: int):
         if self._using_pg:
             async with self._pg_pool.acquire() as conn:
                 await conn.execute("""
@@ -119,50 +407,280 @@ class Database:
                     ON CONFLICT (guild_id, user_id) DO UPDATE SET xp=$3;
                 """, guild_id, user_id, xp)
         else:
-            await self._sqlite_conn.execute("INSERT OR REPLACE INTO xp (guild_id, user_id, xp) VALUES (?, ?, ?)", (guild_id, user_id, xp))
-            await self._sqlite_conn.commit()
+            await self._sqlite.execute("INSERT OR REPLACE INTO xp (guild_id, user_id, xp) VALUES (?, ?, ?)", (guild_id, user_id, xp))
 
     async def reset_user(self, user_id: int, guild_id: int):
+        async with self._flush_lock:
+            self._xp_buffer.discard(guild_id, user_id)
+            await self._reset_user(user_id, guild_id)
+            self._track_xp(guild_id, user_id, None)
+
+    async def _reset_user(self, user_id: int, guild_id: int):
         if self._using_pg:
             async with self._pg_pool.acquire() as conn:
                 await conn.execute("DELETE FROM xp WHERE guild_id=$1 AND user_id=$2", guild_id, user_id)
         else:
-            await self._sqlite_conn.execute("DELETE FROM xp WHERE guild_id=? AND user_id=?", (guild_id, user_id))
-            await self._sqlite_conn.commit()
+            await self._sqlite.execute("DELETE FROM xp WHERE guild_id=? AND user_id=?", (guild_id, user_id))
+
+    # ---------------- Rankings ----------------
+    def _track_xp(self, guild_id: int, user_id: int, xp):
+        """Mirror an absolute XP write (None = row deleted) into the guild's ranking."""
+        ranking = self._rankings.get(guild_id)
+        if ranking is None:
+            return
+        if xp is None:
+            ranking.remove(user_id)
+        else:
+            ranking.set(user_id, xp)
+
+    async def _get_ranking(self, guild_id: int) -> GuildRanking:
+        ranking = self._rankings.get(guild_id)
+        if ranking is not None:
+            return ranking
+        # Every write to the table (flush, award_xp, set_xp, reset_user, import_xp)
+        # holds the flush lock, so stored rows + buffer is exact while we hold it
+        async with self._flush_lock:
+            ranking = self._rankings.get(guild_id)
+            if ranking is not None:
+                return ranking
+            rows = await self._db_guild_xp(guild_id)
+            ranking = GuildRanking(rows)
+            for user_id, delta in self._xp_buffer.for_guild(guild_id):
+                ranking.add(user_id, delta)
+            self._rankings[guild_id] = ranking
+            return ranking
 
     async def get_leaderboard(self, guild_id: int, limit: int = 10):
+        ranking = await self._get_ranking(guild_id)
+        return ranking.top(limit)
+
+    async def get_leaderboard_snapshot(self, guild_id: int, limit: int = 10):
+        """Return (version, rows) for the top `limit` (at most GuildRanking.SNAPSHOT) users.
+
+        The version stays the same until the rows change, so it can key a cached render.
+        """
+        ranking = await self._get_ranking(guild_id)
+        return ranking.snapshot(limit)
+
+    async def get_rank(self, user_id: int, guild_id: int):
+        """Return (rank, total) for a user: 1 + users with more XP, and ranked users in the guild."""
+        ranking = await self._get_ranking(guild_id)
+        return ranking.rank(user_id), len(ranking)
+
+    async def check_ranking(self, guild_id: int, limit: int = 100):
+        """Compare the in-memory ranking with the database.
+
+        Returns a list of mismatch descriptions; an empty list means consistent.
+        """
+        await self.flush_xp()
+        ranking = await self._get_ranking(guild_id)
+        problems = []
+
+        stored = dict(await self._db_guild_xp(guild_id))
+        for user_id in set(stored) | set(ranking._xp):
+            if stored.get(user_id) != ranking.get(user_id):
+                problems.append(f"user {user_id}: db={stored.get(user_id)} memory={ranking.get(user_id)}")
+
+        top = ranking.top(limit)
+        if top != await self._db_leaderboard(guild_id, limit):
+            problems.append(f"top {limit} order differs")
+        for user_id, _ in top:
+            expected = await self._db_rank(user_id, guild_id)
+            actual = (ranking.rank(user_id), len(ranking))
+            if actual != expected:
+                problems.append(f"user {user_id}: db rank={expected} memory rank={actual}")
+        return problems
+
+    async def _db_guild_xp(self, guild_id: int):
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                rows = await conn.fetch("SELECT user_id, xp FROM xp WHERE guild_id=$1", guild_id)
+                return [(r["user_id"], r["xp"]) for r in rows]
+        else:
+            rows = await self._sqlite.fetchall("SELECT user_id, xp FROM xp WHERE guild_id=?", (guild_id,))
+            return [(r[0], r[1]) for r in rows]
+
+    async def _db_leaderboard(self, guild_id: int, limit: int):
         if self._using_pg:
             async with self._pg_pool.acquire() as conn:
-                rows = await conn.fetch("SELECT user_id, xp FROM xp WHERE guild_id=$1 ORDER BY xp DESC LIMIT $2", guild_id, limit)
+                rows = await conn.fetch("SELECT user_id, xp FROM xp WHERE guild_id=$1 ORDER BY xp DESC, user_id LIMIT $2", guild_id, limit)
                 return [(r["user_id"], r["xp"]) for r in rows]
         else:
-            async with self._sqlite_conn.execute("SELECT user_id, xp FROM xp WHERE guild_id=? ORDER BY xp DESC LIMIT ?", (guild_id, limit)) as cur:
-                rows = await cur.fetchall()
-                return [(r[0], r[1]) for r in rows]
+            rows = await self._sqlite.fetchall("SELECT user_id, xp FROM xp WHERE guild_id=? ORDER BY xp DESC, user_id LIMIT ?", (guild_id, limit))
+            return [(r[0], r[1]) for r in rows]
+
+    async def _db_rank(self, user_id: int, guild_id: int):
+        # Both counts are index range scans on (guild_id, xp DESC)
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                row = await conn.fetchrow("""
+                    SELECT
+                        (SELECT COUNT(*) FROM xp WHERE guild_id=$1 AND xp > COALESCE(
+                            (SELECT xp FROM xp WHERE guild_id=$1 AND user_id=$2), 0)) + 1 AS rank,
+                        (SELECT COUNT(*) FROM xp WHERE guild_id=$1) AS total;
+                """, guild_id, user_id)
+                return row["rank"], row["total"]
+        else:
+            row = await self._sqlite.fetchone("""
+                SELECT
+                    (SELECT COUNT(*) FROM xp WHERE guild_id=? AND xp > COALESCE(
+                        (SELECT xp FROM xp WHERE guild_id=? AND user_id=?), 0)) + 1,
+                    (SELECT COUNT(*) FROM xp WHERE guild_id=?);
+            """, (guild_id, guild_id, user_id, guild_id))
+            return row[0], row[1]
+
+    # ---------------- Bulk import/export ----------------
+    async def export_xp(self, guild_id: int, batch_size: int = 1000):
+        """Stream a guild's (user_id, xp) rows in lists of up to batch_size."""
+        await self.flush_xp()
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                # Server-side cursors need a transaction
+                async with conn.transaction():
+                    batch = []
+                    async for r in conn.cursor("SELECT user_id, xp FROM xp WHERE guild_id=$1 ORDER BY user_id", guild_id, prefetch=batch_size):
+                        batch.append((r["user_id"], r["xp"]))
+                        if len(batch) >= batch_size:
+                            yield batch
+                            batch = []
+                    if batch:
+                        yield batch
+        else:
+            async for rows in self._sqlite.iterate("SELECT user_id, xp FROM xp WHERE guild_id=? ORDER BY user_id", (guild_id,), batch_size):
+                yield [(r[0], r[1]) for r in rows]
+
+    async def import_xp(self, guild_id: int, batches, mode: str = "set"):
+        """Load (user_id, xp) rows from an async iterable of batches in one transaction.
+
+        mode="set" overwrites each listed user's XP, mode="add" adds to it.
+        If a user is listed more than once, "set" keeps the last row and "add"
+        adds them all, on both backends. Returns the number of rows read.
+        """
+        if mode not in ("set", "add"):
+            raise ValueError("mode must be 'set' or 'add'")
+        async with self._flush_lock:
+            # Write pending deltas first so "set" really overwrites them
+            await self._flush_pending()
+            try:
+                if self._using_pg:
+                    return await self._import_xp_pg(guild_id, batches, mode)
+                return await self._import_xp_sqlite(guild_id, batches, mode)
+            finally:
+                # Reload the guild's ranking from the table on next access
+                self._rankings.pop(guild_id, None)
+
+    async def _import_xp_pg(self, guild_id: int, batches, mode: str):
+        count = 0
+
+        async def records():
+            nonlocal count
+            async for batch in batches:
+                count += len(batch)
+                for row in batch:
+                    yield row
+
+        update = "EXCLUDED.xp" if mode == "set" else "xp.xp + EXCLUDED.xp"
+        # Collapse duplicate users first, since ON CONFLICT can't touch a row twice.
+        # seq numbers rows in file order, so "set" keeps the last one like SQLite's upserts do.
+        if mode == "set":
+            merged = "SELECT DISTINCT ON (user_id) user_id, xp FROM xp_import ORDER BY user_id, seq DESC"
+        else:
+            merged = "SELECT user_id, SUM(xp) FROM xp_import GROUP BY user_id"
+        async with self._pg_pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("CREATE TEMP TABLE xp_import (seq BIGSERIAL, user_id BIGINT, xp BIGINT) ON COMMIT DROP;")
+                await conn.copy_records_to_table("xp_import", records=records(), columns=["user_id", "xp"])
+                await conn.execute(f"""
+                    INSERT INTO xp (guild_id, user_id, xp)
+                    SELECT $1, merged.* FROM ({merged}) AS merged
+                    ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = {update};
+                """, guild_id)
+        return count
+
+    async def _import_xp_sqlite(self, guild_id: int, batches, mode: str):
+        update = "excluded.xp" if mode == "set" else "xp + excluded.xp"
+        sql = f"""
+            INSERT INTO xp (guild_id, user_id, xp) VALUES (?, ?, ?)
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = {update};
+        """
+
+        async def op(conn):
+            count = 0
+            async for batch in batches:
+                await conn.executemany(sql, [(guild_id, user_id, xp) for user_id, xp in batch])
+                count += len(batch)
+            return count
+
+        return await self._sqlite.write(op)
 
     # ---------------- WARN helpers ----------------
-    async def add_warn(self, user_id: int, guild_id: int):
-        """Add a warn to a user and return total warns."""
+    async def add_warn(self, user_id: int, guild_id: int, moderator_id: int = None, reason: str = None):
+        """Log a warn event and return the user's current warn count.
+
+        The count lives in the warns table as a materialized counter, so the
+        hot path never has to count warn_events rows.
+        """
         if self._using_pg:
             async with self._pg_pool.acquire() as conn:
-                await conn.execute("""
+                return await conn.fetchval("""
+                    WITH event AS (
+                        INSERT INTO warn_events (guild_id, user_id, moderator_id, reason) VALUES ($1, $2, $3, $4)
+                    )
                     INSERT INTO warns (guild_id, user_id, warns) VALUES ($1, $2, 1)
-                    ON CONFLICT (guild_id, user_id) DO UPDATE SET warns = warns + 1;
-                """, guild_id, user_id)
-                row = await conn.fetchrow("SELECT warns FROM warns WHERE guild_id=$1 AND user_id=$2", guild_id, user_id)
-                return row["warns"]
-        else:
-            async with self._sqlite_conn.execute("SELECT warns FROM warns WHERE guild_id=? AND user_id=?", (guild_id, user_id)) as cur:
-                row = await cur.fetchone()
-            if row is None:
-                await self._sqlite_conn.execute("INSERT INTO warns (guild_id, user_id, warns) VALUES (?, ?, 1)", (guild_id, user_id))
-                await self._sqlite_conn.commit()
-                return 1
+                    ON CONFLICT (guild_id, user_id) DO UPDATE SET warns = warns.warns + 1
+                    RETURNING warns;
+                """, guild_id, user_id, moderator_id, reason)
+        else:
+            async def op(conn):
+                await conn.execute("""
+                    INSERT INTO warn_events (guild_id, user_id, moderator_id, reason, created_at)
+                    VALUES (?, ?, ?, ?, ?);
+                """, (guild_id, user_id, moderator_id, reason, int(time.time() * 1000)))
+                async with conn.execute("""
+                    INSERT INTO warns (guild_id, user_id, warns) VALUES (?, ?, 1)
+                    ON CONFLICT (guild_id, user_id) DO UPDATE SET warns = warns + 1
+                    RETURNING warns;
+                """, (guild_id, user_id)) as cur:
+                    row = await cur.fetchone()
+                return row[0]
+
+            return await self._sqlite.write(op)
+
+    async def get_warn_history(self, user_id: int, guild_id: int, limit: int = 10, before=None):
+        """Return up to `limit` warn events, newest first, as (id, moderator_id, reason, created_at).
+
+        Pages are keyset-paginated: pass the (created_at, id) of the last row
+        you got as `before` to fetch the next older page.
+        """
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                if before is None:
+                    rows = await conn.fetch("""
+                        SELECT id, moderator_id, reason, created_at FROM warn_events
+                        WHERE guild_id=$1 AND user_id=$2
+                        ORDER BY created_at DESC, id DESC LIMIT $3
+                    """, guild_id, user_id, limit)
+                else:
+                    rows = await conn.fetch("""
+                        SELECT id, moderator_id, reason, created_at FROM warn_events
+                        WHERE guild_id=$1 AND user_id=$2 AND (created_at, id) < ($3, $4)
+                        ORDER BY created_at DESC, id DESC LIMIT $5
+                    """, guild_id, user_id, before[0], before[1], limit)
+                return [(r["id"], r["moderator_id"], r["reason"], r["created_at"]) for r in rows]
+        else:
+            if before is None:
+                rows = await self._sqlite.fetchall("""
+                    SELECT id, moderator_id, reason, created_at FROM warn_events
+                    WHERE guild_id=? AND user_id=?
+                    ORDER BY created_at DESC, id DESC LIMIT ?
+                """, (guild_id, user_id, limit))
             else:
-                new_warns = row[0] + 1
-                await self._sqlite_conn.execute("UPDATE warns SET warns=? WHERE guild_id=? AND user_id=?", (new_warns, guild_id, user_id))
-                await self._sqlite_conn.commit()
-                return new_warns
+                rows = await self._sqlite.fetchall("""
+                    SELECT id, moderator_id, reason, created_at FROM warn_events
+                    WHERE guild_id=? AND user_id=? AND (created_at, id) < (?, ?)
+                    ORDER BY created_at DESC, id DESC LIMIT ?
+                """, (guild_id, user_id, round(before[0].timestamp() * 1000), before[1], limit))
+            return [(r[0], r[1], r[2], datetime.datetime.fromtimestamp(r[3] / 1000, datetime.timezone.utc)) for r in rows]
 
     async def get_warns(self, user_id: int, guild_id: int):
         if self._using_pg:
@@ -170,26 +688,117 @@ class Database:
                 row = await conn.fetchrow("SELECT warns FROM warns WHERE guild_id=$1 AND user_id=$2", guild_id, user_id)
                 return row["warns"] if row else 0
         else:
-            async with self._sqlite_conn.execute("SELECT warns FROM warns WHERE guild_id=? AND user_id=?", (guild_id, user_id)) as cur:
-                row = await cur.fetchone()
-                return row[0] if row else 0
+            row = await self._sqlite.fetchone("SELECT warns FROM warns WHERE guild_id=? AND user_id=?", (guild_id, user_id))
+            return row[0] if row else 0
 
     async def reset_warns(self, user_id: int, guild_id: int):
         if self._using_pg:
             async with self._pg_pool.acquire() as conn:
                 await conn.execute("DELETE FROM warns WHERE guild_id=$1 AND user_id=$2", guild_id, user_id)
         else:
-            await self._sqlite_conn.execute("DELETE FROM warns WHERE guild_id=? AND user_id=?", (guild_id, user_id))
-            await self._sqlite_conn.commit()
+            await self._sqlite.execute("DELETE FROM warns WHERE guild_id=? AND user_id=?", (guild_id, user_id))
+
+    # ---------------- Scheduled actions ----------------
+    async def add_scheduled_action(self, guild_id: int, user_id: int, action: str, run_at: float, payload: str = None):
+        """Persist a timed action and return its id."""
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                return await conn.fetchval("""
+                    INSERT INTO scheduled_actions (guild_id, user_id, action, run_at, payload)
+                    VALUES ($1, $2, $3, $4, $5) RETURNING id;
+                """, guild_id, user_id, action, run_at, payload)
+        else:
+            rows = await self._sqlite.execute("""
+                INSERT INTO scheduled_actions (guild_id, user_id, action, run_at, payload)
+                VALUES (?, ?, ?, ?, ?) RETURNING id;
+            """, (guild_id, user_id, action, run_at, payload))
+            return rows[0][0]
+
+    async def get_scheduled_actions(self):
+        """Return every pending action as (id, guild_id, user_id, action, run_at, payload)."""
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                rows = await conn.fetch("SELECT id, guild_id, user_id, action, run_at, payload FROM scheduled_actions ORDER BY run_at")
+                return [tuple(r) for r in rows]
+        else:
+            rows = await self._sqlite.fetchall("SELECT id, guild_id, user_id, action, run_at, payload FROM scheduled_actions ORDER BY run_at")
+            return [tuple(r) for r in rows]
+
+    async def delete_scheduled_actions(self, ids):
+        if not ids:
+            return
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                await conn.execute("DELETE FROM scheduled_actions WHERE id = ANY($1::bigint[])", list(ids))
+        else:
+            await self._sqlite.executemany("DELETE FROM scheduled_actions WHERE id=?", [(i,) for i in ids])
+
+    async def cancel_scheduled_actions(self, guild_id: int, user_id: int, action: str):
+        """Delete a member's pending actions of one kind and return their ids."""
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                rows = await conn.fetch("""
+                    DELETE FROM scheduled_actions WHERE guild_id=$1 AND user_id=$2 AND action=$3 RETURNING id;
+                """, guild_id, user_id, action)
+                return [r["id"] for r in rows]
+        else:
+            rows = await self._sqlite.execute("""
+                DELETE FROM scheduled_actions WHERE guild_id=? AND user_id=? AND action=? RETURNING id;
+            """, (guild_id, user_id, action))
+            return [r[0] for r in rows]
+
+    # ---------------- Guild settings ----------------
+    async def get_guild_settings(self, guild_id: int = None):
+        """Return stored overrides as (guild_id, key, value) rows, for one guild or all of them."""
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                if guild_id is None:
+                    rows = await conn.fetch("SELECT guild_id, key, value FROM guild_settings")
+                else:
+                    rows = await conn.fetch("SELECT guild_id, key, value FROM guild_settings WHERE guild_id=$1", guild_id)
+                return [tuple(r) for r in rows]
+        else:
+            if guild_id is None:
+                rows = await self._sqlite.fetchall("SELECT guild_id, key, value FROM guild_settings")
+            else:
+                rows = await self._sqlite.fetchall("SELECT guild_id, key, value FROM guild_settings WHERE guild_id=?", (guild_id,))
+            return [tuple(r) for r in rows]
+
+    async def set_guild_setting(self, guild_id: int, key: str, value: str):
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                await conn.execute("""
+                    INSERT INTO guild_settings (guild_id, key, value) VALUES ($1, $2, $3)
+                    ON CONFLICT (guild_id, key) DO UPDATE SET value = EXCLUDED.value;
+                """, guild_id, key, value)
+        else:
+            await self._sqlite.execute("""
+                INSERT INTO guild_settings (guild_id, key, value) VALUES (?, ?, ?)
+                ON CONFLICT(guild_id, key) DO UPDATE SET value = excluded.value;
+            """, (guild_id, key, value))
+
+    async def delete_guild_setting(self, guild_id: int, key: str):
+        if self._using_pg:
+            async with self._pg_pool.acquire() as conn:
+                await conn.execute("DELETE FROM guild_settings WHERE guild_id=$1 AND key=$2", guild_id, key)
+        else:
+            await self._sqlite.execute("DELETE FROM guild_settings WHERE guild_id=? AND key=?", (guild_id, key))
 
     # ---------------- Misc ----------------
     @staticmethod
     def xp_to_level(xp: int) -> int:
-        # Updated to use exponential formula: level = floor(0.1 * sqrt(xp)) + 1
-        return math.floor(0.1 * math.sqrt(xp)) + 1 if xp > 0 else 1
+        # level = floor(0.1 * sqrt(xp)) + 1, resolved exactly from the shared curve table
+        return level_for(xp)
 
     async def close(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        try:
+            await self.flush_xp()
+        except Exception as e:
+            print(f"XP flush error on shutdown: {e}")
         if self._using_pg and self._pg_pool:
             await self._pg_pool.close()
-        if self._sqlite_conn:
-            await self._sqlite_conn.close()
+        if self._sqlite:
+            await self._sqlite.close()
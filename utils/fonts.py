@@ -0,0 +1,61 @@
+"""
+Font registry for image rendering.
+
+Cards and leaderboards draw with the DejaVu fonts bundled in assets/fonts, so
+they look the same on every host instead of depending on whatever fonts the
+system has (Arial isn't installed on Linux, and Pillow's bitmap fallback
+font is tiny and can't draw most non-Latin characters).
+
+Each (family, size) is parsed from disk once per process and reused. Text
+widths are cached as well, because truncating names to fit re-measures the
+same strings for every render.
+"""
+
+import os
+from functools import lru_cache
+
+from PIL import ImageFont
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "fonts")
+FAMILIES = {
+    "regular": "DejaVuSans.ttf",
+    "bold": "DejaVuSans-Bold.ttf",
+}
+ELLIPSIS = "…"
+
+
+@lru_cache(maxsize=None)
+def get(family: str, size: int):
+    """The font for a family and pixel size, loaded on first use."""
+    path = os.path.join(FONT_DIR, FAMILIES[family])
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError as e:
+        print(f"Font error ({path}): {e}; using Pillow's default font")
+        return ImageFont.load_default()
+
+
+def preload(sizes):
+    """Load (family, size) pairs up front, e.g. when the cog loads."""
+    for family, size in sizes:
+        get(family, size)
+
+
+@lru_cache(maxsize=8192)
+def text_width(family: str, size: int, text: str) -> int:
+    return int(get(family, size).getlength(text))
+
+
+def truncate(family: str, size: int, text: str, max_width: int) -> str:
+    """Shorten text with an ellipsis until it fits in max_width pixels."""
+    if text_width(family, size, text) <= max_width:
+        return text
+    # Binary search for the longest prefix that fits together with the ellipsis
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if text_width(family, size, text[:mid] + ELLIPSIS) <= max_width:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + ELLIPSIS
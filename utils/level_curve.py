@@ -0,0 +1,87 @@
+"""
+Integer-exact level curve shared by every XP consumer.
+
+Level L starts at floor_xp(L) = 100 * (L - 1) ** 2 XP, the same curve as the
+original floor(0.1 * sqrt(xp)) + 1 formula but without float rounding. The
+thresholds for levels 1..MAX_TABLE_LEVEL are precomputed so lookups are a
+bisect; anything beyond the table falls back to math.isqrt.
+
+Usage:
+- level_for(xp)           -> level
+- floor_xp(level)         -> XP at which the level starts
+- ceiling_xp(level)       -> XP at which the next level starts
+- progress(xp)            -> LevelProgress(level, floor, ceiling, fraction)
+- levels_for(xps) / progress_for(xps) for whole leaderboards
+"""
+
+from bisect import bisect_right
+from math import isqrt
+from typing import NamedTuple
+
+XP_STEP = 100  # (1 / 0.1) ** 2 from the original formula
+MAX_TABLE_LEVEL = 1000
+
+# THRESHOLDS[i] is the XP needed for level i + 1
+THRESHOLDS = tuple(XP_STEP * i * i for i in range(MAX_TABLE_LEVEL))
+
+
+class LevelProgress(NamedTuple):
+    level: int
+    floor: int
+    ceiling: int
+    fraction: float
+
+
+def floor_xp(level: int) -> int:
+    if level <= 1:
+        return 0
+    if level <= MAX_TABLE_LEVEL:
+        return THRESHOLDS[level - 1]
+    return XP_STEP * (level - 1) ** 2
+
+
+def ceiling_xp(level: int) -> int:
+    return floor_xp(level + 1)
+
+
+def level_for(xp: int) -> int:
+    if xp <= 0:
+        return 1
+    if xp < THRESHOLDS[-1]:
+        return bisect_right(THRESHOLDS, xp)
+    return isqrt(xp // XP_STEP) + 1
+
+
+def progress(xp: int) -> LevelProgress:
+    level = level_for(xp)
+    low, high = floor_xp(level), ceiling_xp(level)
+    fraction = (max(xp, 0) - low) / (high - low)
+    return LevelProgress(level, low, high, fraction)
+
+
+def levels_for(xps) -> list:
+    """Levels for many XP values at once.
+
+    Leaderboard input arrives sorted by XP descending, so that case is handled
+    with a single walk down the threshold table instead of one bisect per row.
+    """
+    xps = list(xps)
+    if any(a < b for a, b in zip(xps, xps[1:])):
+        return [level_for(xp) for xp in xps]
+
+    levels = []
+    level = level_for(xps[0]) if xps else 1
+    for xp in xps:
+        while level > 1 and xp < floor_xp(level):
+            level -= 1
+        levels.append(level)
+    return levels
+
+
+def progress_for(xps) -> list:
+    xps = list(xps)
+    result = []
+    for xp, level in zip(xps, levels_for(xps)):
+        low, high = floor_xp(level), ceiling_xp(level)
+        result.append(LevelProgress(level, low, high, (max(xp, 0) - low) / (high - low)))
+    return result
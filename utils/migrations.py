@@ -0,0 +1,192 @@
+"""
+Versioned schema migrations for SQLite and Postgres.
+
+MIGRATIONS is an ordered list of (version, description, steps) where steps maps
+"sqlite"/"postgres" to the statements for that backend. The applied versions
+are recorded in a schema_version table, and each pending migration runs in its
+own transaction together with its schema_version row, so a failed step leaves
+the database at the previous version.
+
+To change the schema, append a new entry with the next version number; never
+edit a migration that has already shipped.
+"""
+
+MIGRATIONS = [
+    (1, "xp and warns tables", {
+        "sqlite": [
+            """
+            CREATE TABLE IF NOT EXISTS xp (
+                guild_id INTEGER,
+                user_id INTEGER,
+                xp INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id)
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS warns (
+                guild_id INTEGER,
+                user_id INTEGER,
+                warns INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id)
+            );
+            """,
+        ],
+        "postgres": [
+            """
+            CREATE TABLE IF NOT EXISTS xp (
+                guild_id BIGINT,
+                user_id BIGINT,
+                xp BIGINT DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id)
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS warns (
+                guild_id BIGINT,
+                user_id BIGINT,
+                warns INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id)
+            );
+            """,
+        ],
+    }),
+    (2, "index xp by (guild_id, xp DESC) for ranks and leaderboards", {
+        "sqlite": ["CREATE INDEX IF NOT EXISTS idx_xp_guild_xp ON xp (guild_id, xp DESC);"],
+        "postgres": ["CREATE INDEX IF NOT EXISTS idx_xp_guild_xp ON xp (guild_id, xp DESC);"],
+    }),
+    (3, "append-only warn event log", {
+        "sqlite": [
+            """
+            CREATE TABLE IF NOT EXISTS warn_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                moderator_id INTEGER,
+                reason TEXT,
+                created_at INTEGER NOT NULL -- unix time in milliseconds
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_warn_events_user ON warn_events (guild_id, user_id, created_at);",
+        ],
+        "postgres": [
+            """
+            CREATE TABLE IF NOT EXISTS warn_events (
+                id BIGSERIAL PRIMARY KEY,
+                guild_id BIGINT NOT NULL,
+                user_id BIGINT NOT NULL,
+                moderator_id BIGINT,
+                reason TEXT,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_warn_events_user ON warn_events (guild_id, user_id, created_at);",
+        ],
+    }),
+    (4, "scheduled actions (timed unmutes)", {
+        "sqlite": [
+            """
+            CREATE TABLE IF NOT EXISTS scheduled_actions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                run_at REAL NOT NULL, -- unix time in seconds
+                payload TEXT
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_scheduled_actions_run_at ON scheduled_actions (run_at);",
+            "CREATE INDEX IF NOT EXISTS idx_scheduled_actions_target ON scheduled_actions (guild_id, user_id, action);",
+        ],
+        "postgres": [
+            """
+            CREATE TABLE IF NOT EXISTS scheduled_actions (
+                id BIGSERIAL PRIMARY KEY,
+                guild_id BIGINT NOT NULL,
+                user_id BIGINT NOT NULL,
+                action TEXT NOT NULL,
+                run_at DOUBLE PRECISION NOT NULL, -- unix time in seconds
+                payload TEXT
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_scheduled_actions_run_at ON scheduled_actions (run_at);",
+            "CREATE INDEX IF NOT EXISTS idx_scheduled_actions_target ON scheduled_actions (guild_id, user_id, action);",
+        ],
+    }),
+    (5, "per-guild setting overrides", {
+        "sqlite": [
+            """
+            CREATE TABLE IF NOT EXISTS guild_settings (
+                guild_id INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (guild_id, key)
+            );
+            """,
+        ],
+        "postgres": [
+            """
+            CREATE TABLE IF NOT EXISTS guild_settings (
+                guild_id BIGINT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (guild_id, key)
+            );
+            """,
+        ],
+    }),
+]
+
+# Arbitrary key for pg_advisory_xact_lock so two bot processes don't migrate at once
+_PG_LOCK_KEY = 0x61726561_3131
+
+
+async def migrate_sqlite(engine):
+    """Apply pending migrations through a SQLiteEngine. Returns the versions applied."""
+    await engine.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    rows = await engine.fetchall("SELECT version FROM schema_version")
+    done = {r[0] for r in rows}
+
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if version in done:
+            continue
+
+        async def op(conn, steps=steps["sqlite"], version=version, description=description):
+            for sql in steps:
+                await conn.execute(sql)
+            await conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (version, description))
+
+        # Each write runs inside its own savepoint, so the migration is all-or-nothing
+        await engine.write(op)
+        applied.append(version)
+    return applied
+
+
+async def migrate_postgres(pool):
+    """Apply pending migrations on an asyncpg pool. Returns the versions applied."""
+    applied = []
+    async with pool.acquire() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMPTZ DEFAULT now()
+            );
+        """)
+        for version, description, steps in MIGRATIONS:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", _PG_LOCK_KEY)
+                exists = await conn.fetchval("SELECT 1 FROM schema_version WHERE version=$1", version)
+                if exists:
+                    continue
+                for sql in steps["postgres"]:
+                    await conn.execute(sql)
+                await conn.execute("INSERT INTO schema_version (version, description) VALUES ($1, $2)", version, description)
+            applied.append(version)
+    return applied
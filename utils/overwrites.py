@@ -0,0 +1,126 @@
+"""
+Bulk permission-overwrite rollout (e.g. locking every channel for the Muted role).
+
+Applying an overwrite to hundreds of channels one await at a time takes
+minutes. OverwriteRollout first compares each channel's cached overwrite for
+the target with the desired one and skips channels that already match (no API
+call), then applies the rest from a small pool of workers.
+
+Rate limits: discord.py already queues requests per route bucket and retries
+ordinary 429s. The worker cap keeps the rollout from flooding those buckets,
+and if the library gives up (RateLimited) or a 429/5xx escapes, every worker
+pauses until the advertised retry time before trying again.
+
+Because matching channels are skipped, running a rollout again resumes an
+interrupted or partially failed one, and costs nothing once it is complete.
+"""
+
+import asyncio
+import time
+
+import discord
+
+
+def overwrite_matches(current: discord.PermissionOverwrite, desired: discord.PermissionOverwrite) -> bool:
+    """True if every permission set in desired has the same value in current."""
+    for perm, value in desired:
+        if value is not None and getattr(current, perm) != value:
+            return False
+    return True
+
+
+class RolloutReport:
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.skipped = 0
+        self.applied = 0
+        self.failed = []  # (channel, error message)
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def done(self) -> int:
+        return self.skipped + self.applied + len(self.failed)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self) -> str:
+        return (f"{self.done}/{self.total} channels: {self.applied} updated, "
+                f"{self.skipped} already set, {len(self.failed)} failed ({self.elapsed:.1f}s)")
+
+
+class OverwriteRollout:
+    def __init__(self, target, overwrite: discord.PermissionOverwrite, concurrency: int = 5,
+                 max_retries: int = 3, reason: str = None, clock=time.monotonic):
+        self.target = target
+        self.overwrite = overwrite
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.reason = reason
+        self._clock = clock
+        self._paused_until = 0.0
+        self.report = RolloutReport()
+
+    async def run(self, channels) -> RolloutReport:
+        """Apply the overwrite to every channel that doesn't already match. The live report is self.report."""
+        channels = list(channels)
+        report = self.report = RolloutReport(len(channels))
+        queue = asyncio.Queue()
+        for channel in channels:
+            if overwrite_matches(channel.overwrites_for(self.target), self.overwrite):
+                report.skipped += 1
+            else:
+                queue.put_nowait(channel)
+
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(min(self.concurrency, queue.qsize()))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            report.finished = time.monotonic()
+        return report
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            try:
+                channel = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._apply(channel)
+
+    async def _apply(self, channel):
+        report = self.report
+        for attempt in range(self.max_retries + 1):
+            wait = self._paused_until - self._clock()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            # Merge into the existing overwrite so unrelated settings are kept
+            merged = channel.overwrites_for(self.target)
+            merged.update(**{perm: value for perm, value in self.overwrite if value is not None})
+            try:
+                await channel.set_permissions(self.target, overwrite=merged, reason=self.reason)
+                report.applied += 1
+                return
+            except discord.Forbidden:
+                report.failed.append((channel, "missing permissions"))
+                return
+            except discord.NotFound:
+                report.skipped += 1  # Channel was deleted meanwhile
+                return
+            except discord.RateLimited as e:
+                self._pause(e.retry_after)
+                error = "rate limited"
+            except discord.HTTPException as e:
+                if e.status != 429 and e.status < 500:
+                    report.failed.append((channel, e.text or str(e.status)))
+                    return
+                self._pause(2 ** attempt)
+                error = f"HTTP {e.status}"
+        report.failed.append((channel, error))
+
+    def _pause(self, seconds: float):
+        # Shared by all workers so the whole rollout backs off together
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
@@ -0,0 +1,113 @@
+"""
+Background pipeline for message side effects.
+
+on_message hands XP awards, level-up announcements and spam escalation to an
+EventPipeline instead of awaiting them, so a slow database or a Discord rate
+limit never delays command dispatch. Jobs sit in a bounded queue drained by a
+small pool of worker tasks.
+
+Every job has a key, e.g. ("xp", guild_id, user_id). A job submitted while
+another with the same key is still queued replaces it (coalescing), so a
+burst from one member occupies one slot. When the queue is full, droppable
+jobs are dropped and the rest go to an overflow lane that workers move back
+into the queue as slots free up. submit() never waits, so command dispatch
+right after it always starts immediately.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+class EventPipeline:
+    def __init__(self, workers: int = 4, maxsize: int = 1000, clock=time.monotonic):
+        self.worker_count = workers
+        self._clock = clock
+        self._queue = asyncio.Queue(maxsize)
+        # Non-droppable keys that arrived while the queue was full, oldest first.
+        # Coalescing keeps it to one entry per member, so it stays small.
+        self._overflow = deque()
+        self._jobs = {}
+        self._workers = []
+
+        # Metrics
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflowed = 0
+        self.max_depth = 0
+        self.max_lag = 0.0
+        self._lag_avg = 0.0
+
+    def start(self):
+        for i in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"pipeline-worker-{i}"))
+
+    async def stop(self, timeout: float = 10.0):
+        """Let queued jobs finish (up to timeout seconds), then cancel the workers."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Pipeline stopped with {self._queue.qsize()} jobs still queued")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, key, factory, droppable: bool = False) -> bool:
+        """Queue `factory()` (a coroutine function) under key without waiting. Returns False if it was dropped."""
+        now = self._clock()
+        if key in self._jobs:
+            # Keep the original enqueue time so lag stays honest
+            self._jobs[key] = (factory, self._jobs[key][1])
+            self.coalesced += 1
+            return True
+
+        # Once anything has overflowed, new jobs go behind it to keep submission order
+        if self._queue.full() or self._overflow:
+            if droppable:
+                self.dropped += 1
+                return False
+            self._jobs[key] = (factory, now)
+            self._overflow.append(key)
+            self.overflowed += 1
+        else:
+            self._jobs[key] = (factory, now)
+            self._queue.put_nowait(key)
+        self.max_depth = max(self.max_depth, self._queue.qsize() + len(self._overflow))
+        return True
+
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            # A slot just freed up; refill it from the overflow lane before anything else can take it
+            while self._overflow and not self._queue.full():
+                self._queue.put_nowait(self._overflow.popleft())
+            try:
+                factory, enqueued = self._jobs.pop(key)
+                lag = self._clock() - enqueued
+                self.max_lag = max(self.max_lag, lag)
+                self._lag_avg += (lag - self._lag_avg) * 0.05
+                await factory()
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Pipeline job {key[0]} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def metrics(self) -> dict:
+        return {
+            "depth": self._queue.qsize() + len(self._overflow),
+            "max_depth": self.max_depth,
+            "capacity": self._queue.maxsize,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "overflow": len(self._overflow),
+            "overflowed": self.overflowed,
+            "lag_avg_ms": round(self._lag_avg * 1000, 1),
+            "lag_max_ms": round(self.max_lag * 1000, 1),
+        }
@@ -0,0 +1,141 @@
+"""
+Streaming, filtered message purge.
+
+Purge walks channel.history lazily (discord.py fetches it 100 messages per
+request) and keeps at most one bulk chunk in memory, so scanning tens of
+thousands of messages costs the same memory as scanning a hundred. Messages
+that pass the check are bulk-deleted 100 at a time. Discord's bulk endpoint
+refuses messages older than 14 days, and history runs newest first, so once the
+first old message shows up the open chunk is flushed and everything after it is
+deleted one by one.
+
+The live PurgeResult is exposed as Purge.result, so callers can report
+progress and throughput while run() is still going.
+"""
+
+import datetime
+import re
+import time
+
+import discord
+
+BULK_LIMIT = 100
+BULK_MAX_AGE = datetime.timedelta(days=14)
+# Keep clear of the 14-day edge so a chunk doesn't age out while it fills
+BULK_MARGIN = datetime.timedelta(minutes=5)
+
+LINK_RE = re.compile(r"https?://|discord(?:app)?\.(?:gg|com/invite)/", re.IGNORECASE)
+
+
+class PurgeFilter:
+    """Message check combining every filter that is set (all must match)."""
+
+    def __init__(self, authors=None, bots: bool = False, pattern: str = None,
+                 attachments: bool = False, links: bool = False):
+        self.authors = set(authors) if authors else None
+        self.bots = bots
+        self.pattern = re.compile(pattern, re.IGNORECASE) if pattern else None
+        self.attachments = attachments
+        self.links = links
+
+    def __call__(self, message: discord.Message) -> bool:
+        if self.authors is not None and message.author.id not in self.authors:
+            return False
+        if self.bots and not message.author.bot:
+            return False
+        if self.attachments and not message.attachments:
+            return False
+        if self.links and not LINK_RE.search(message.content):
+            return False
+        if self.pattern and not self.pattern.search(message.content):
+            return False
+        return True
+
+
+class PurgeResult:
+    def __init__(self):
+        self.scanned = 0
+        self.deleted = 0
+        self.bulk_requests = 0
+        self.single_deletes = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def rate(self) -> float:
+        """Deleted messages per second."""
+        return self.deleted / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        text = (f"Deleted {self.deleted} of {self.scanned} scanned messages in {self.elapsed:.1f}s "
+                f"({self.rate:.0f}/s; {self.bulk_requests} bulk, {self.single_deletes} single)")
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text
+
+
+class Purge:
+    def __init__(self, channel, check=None, limit: int = None, before=None, after=None, reason: str = None):
+        self.channel = channel
+        self.check = check
+        self.limit = limit
+        self.before = before
+        self.after = after
+        self.reason = reason
+        self.result = PurgeResult()
+
+    async def run(self) -> PurgeResult:
+        """Scan up to `limit` messages and delete the ones passing `check`. Forbidden is raised."""
+        result = self.result = PurgeResult()
+        cutoff = discord.utils.time_snowflake(discord.utils.utcnow() - BULK_MAX_AGE + BULK_MARGIN)
+        chunk = []
+        try:
+            async for message in self.channel.history(limit=self.limit, before=self.before,
+                                                      after=self.after, oldest_first=False):
+                result.scanned += 1
+                if self.check is not None and not self.check(message):
+                    continue
+                if message.id >= cutoff:
+                    chunk.append(message)
+                    if len(chunk) == BULK_LIMIT:
+                        await self._bulk(chunk)
+                        chunk = []
+                else:
+                    if chunk:
+                        await self._bulk(chunk)
+                        chunk = []
+                    await self._single(message)
+            if chunk:
+                await self._bulk(chunk)
+        finally:
+            result.finished = time.monotonic()
+        return result
+
+    async def _bulk(self, chunk):
+        try:
+            # delete_messages falls back to a single delete for a one-message chunk
+            await self.channel.delete_messages(chunk, reason=self.reason)
+            self.result.bulk_requests += 1
+            self.result.deleted += len(chunk)
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException as e:
+            print(f"Bulk delete of {len(chunk)} messages in #{self.channel} failed: {e}")
+            self.result.failed += len(chunk)
+
+    async def _single(self, message):
+        try:
+            await message.delete()
+            self.result.single_deletes += 1
+            self.result.deleted += 1
+        except discord.NotFound:
+            pass  # Already gone
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException:
+            self.result.failed += 1
@@ -0,0 +1,77 @@
+"""
+Cache of finished renders (PNG bytes) keyed by everything that goes into them.
+
+A key is a tuple of the render inputs: user, XP, rank, avatar key, display
+name, theme and so on. Identical inputs produce identical images, so a hit
+can be sent as is, and any change to the inputs is a different key. Nothing
+needs explicit invalidation, and old keys age out of the LRU.
+
+Entries live for `ttl` seconds and the total size is kept under `max_bytes`.
+Concurrent requests for the same key share one in-flight render
+(single-flight), so ten simultaneous /leaderboard calls render once.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class RenderCache:
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, ttl: float = 300.0, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (data, expires)
+        self._pending = {}
+        self.bytes = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    async def get_or_render(self, key, factory) -> bytes:
+        """Return cached bytes for key, or await factory() -> (data, cacheable) once for all callers."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._drop(key)
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            pending = self._pending[key] = asyncio.ensure_future(self._render(key, factory))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _render(self, key, factory) -> bytes:
+        data, cacheable = await factory()
+        if cacheable and len(data) <= self.max_bytes:
+            self._entries[key] = (data, self._clock() + self.ttl)
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                old_key = next(iter(self._entries))
+                self._drop(old_key)
+                self.evictions += 1
+        return data
+
+    def _drop(self, key):
+        data, _ = self._entries.pop(key)
+        self.bytes -= len(data)
+
+    def metrics(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,76 @@
+"""
+Runs CPU-bound rendering off the event loop.
+
+Drawing, blurring and PNG encoding in Pillow can take tens of milliseconds, and
+doing it on the event loop stalls the gateway heartbeat and every other command.
+RenderService hands the pure render functions in utils/render.py to a thread
+or process pool. Pillow releases the GIL for most heavy operations, so threads
+are usually enough; processes spread renders over all cores at the cost of
+pickling the inputs and output.
+
+At most `max_in_flight` renders are submitted at once. A caller that cannot
+get a slot within `queue_timeout` seconds gets RenderBusy instead of piling up
+behind a backlog.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+EXECUTORS = ("thread", "process")
+
+
+class RenderBusy(Exception):
+    """Raised when no render slot frees up within the queue timeout."""
+
+
+class RenderService:
+    def __init__(self, kind: str = "thread", workers: int = None, max_in_flight: int = 8, queue_timeout: float = 10.0):
+        if kind not in EXECUTORS:
+            raise ValueError(f"Render executor must be one of {EXECUTORS}, not {kind!r}")
+        self.kind = kind
+        if kind == "process":
+            # Spawned rather than forked: the bot process has live sockets and database threads
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+
+        # Metrics
+        self.in_flight = 0
+        self.rendered = 0
+        self.rejected = 0
+        self.total_time = 0.0
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in the pool and return its result. fn must be a module-level function."""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise RenderBusy(f"{self.max_in_flight} renders already in flight")
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.total_time += time.perf_counter() - start
+            self.rendered += 1
+            self.in_flight -= 1
+            self._slots.release()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> dict:
+        return {
+            "executor": self.kind,
+            "in_flight": self.in_flight,
+            "capacity": self.max_in_flight,
+            "rendered": self.rendered,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_time / self.rendered * 1000, 1) if self.rendered else 0.0,
+        }
@@ -0,0 +1,116 @@
+"""
+Durable scheduler for timed moderation actions (e.g. lifting a role mute).
+
+Actions are stored in the scheduled_actions table and mirrored in an
+in-process min-heap ordered by run_at. A single timer task sleeps until the
+earliest action is due, then runs every due action as one batch and deletes
+them in one statement. Thousands of pending mutes therefore cost one sleeping
+task, and anything still pending is reloaded from the database on restart.
+
+Handlers are registered per action name and called as
+`await handler(guild_id, user_id, payload)`, where payload is the decoded
+JSON passed to schedule().
+"""
+
+import asyncio
+import heapq
+import json
+import time
+
+
+class Scheduler:
+    def __init__(self, db, clock=time.time):
+        self.db = db
+        self._clock = clock
+        self._handlers = {}
+        self._heap = []  # (run_at, id, guild_id, user_id, action, payload)
+        self._cancelled = set()
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def register(self, action: str, handler):
+        self._handlers[action] = handler
+
+    def __len__(self):
+        return len(self._heap) - len(self._cancelled)
+
+    async def start(self):
+        """Load pending actions from the database and start the timer task."""
+        for action_id, guild_id, user_id, action, run_at, payload in await self.db.get_scheduled_actions():
+            self._heap.append((run_at, action_id, guild_id, user_id, action, payload))
+        heapq.heapify(self._heap)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def schedule(self, guild_id: int, user_id: int, action: str, delay: float, payload=None) -> int:
+        run_at = self._clock() + delay
+        encoded = json.dumps(payload) if payload is not None else None
+        action_id = await self.db.add_scheduled_action(guild_id, user_id, action, run_at, encoded)
+        heapq.heappush(self._heap, (run_at, action_id, guild_id, user_id, action, encoded))
+        if self._heap[0][1] == action_id:
+            # New earliest deadline, so the timer has to re-arm
+            self._wake.set()
+        return action_id
+
+    async def cancel(self, guild_id: int, user_id: int, action: str) -> int:
+        """Drop a member's pending actions of one kind; returns how many were cancelled."""
+        ids = await self.db.cancel_scheduled_actions(guild_id, user_id, action)
+        # Heap entries are skipped lazily when they reach the top
+        self._cancelled.update(ids)
+        return len(ids)
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                await self._wake.wait()
+                self._wake.clear()
+                continue
+
+            delay = self._heap[0][0] - self._clock()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+
+            now = self._clock()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                item = heapq.heappop(self._heap)
+                if item[1] in self._cancelled:
+                    self._cancelled.discard(item[1])
+                else:
+                    due.append(item)
+            if due:
+                await self._run_batch(due)
+
+    async def _run_batch(self, due):
+        async def run(item):
+            _, action_id, guild_id, user_id, action, payload = item
+            handler = self._handlers.get(action)
+            if handler is None:
+                print(f"Scheduler: no handler for {action!r} (id {action_id})")
+                return
+            try:
+                await handler(guild_id, user_id, json.loads(payload) if payload else None)
+            except Exception as e:
+                print(f"Scheduled {action} for {user_id} in {guild_id} failed: {e}")
+
+        await asyncio.gather(*(run(item) for item in due))
+        ids = [item[1] for item in due]
+        # A cancel() that raced with this batch has nothing left to skip
+        self._cancelled.difference_update(ids)
+        try:
+            await self.db.delete_scheduled_actions(ids)
+        except Exception as e:
+            print(f"Scheduler cleanup error: {e}")
@@ -0,0 +1,218 @@
+"""
+Per-guild settings backed by the guild_settings table and an in-memory cache.
+
+SETTINGS lists every knob with its default, parser and formatter. Only
+overrides are stored (one row per guild and key, value as text), so a guild
+that never ran `config` has no rows at all.
+
+SettingsCache keeps one immutable GuildSettings per guild. All guilds are
+loaded in one query at startup, joined guilds are fetched on join, and get()
+is a plain dict lookup, so on_message reads settings without touching the
+database. A change is written to the database first and then swaps in a new
+GuildSettings object, so readers never see a half-applied update.
+"""
+
+import asyncio
+
+
+def parse_duration(text: str) -> int:
+    """Seconds in a duration like 10m, 1h or 2d (bare numbers are minutes). Raises ValueError."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if text[-1:] in units:
+        return int(text[:-1]) * units[text[-1]]
+    return int(text) * 60
+
+
+def format_duration(seconds: int) -> str:
+    for suffix, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds and seconds % size == 0:
+            return f"{seconds // size}{suffix}"
+    return f"{seconds}s"
+
+
+# -------- Escalation ladder --------
+# Written as "3=mute 1h, 4=mute 1d, 5=kick, 6=ban": at each warn count the matching
+# step runs, and any count above the last step repeats the last step.
+LADDER_ACTIONS = ("mute", "kick", "ban")
+
+
+def parse_ladder(text: str):
+    steps = {}
+    for part in text.split(","):
+        try:
+            warns, action = part.split("=", 1)
+            warns = int(warns)
+            action, *duration = action.split()
+        except ValueError:
+            raise ValueError(f"Can't read step `{part.strip()}`; use e.g. `3=mute 1h, 5=kick, 6=ban`")
+        if warns < 1 or action not in LADDER_ACTIONS:
+            raise ValueError(f"Steps need a warn count of 1+ and one of: {', '.join(LADDER_ACTIONS)}")
+        seconds = 0
+        if action == "mute":
+            if len(duration) != 1:
+                raise ValueError("Mute steps need a duration, e.g. `3=mute 1h`")
+            seconds = parse_duration(duration[0])
+        steps[warns] = (warns, action, seconds)
+    return tuple(sorted(steps.values()))
+
+
+def format_ladder(ladder) -> str:
+    return ", ".join(f"{warns}={action} {format_duration(seconds)}" if action == "mute" else f"{warns}={action}"
+                     for warns, action, seconds in ladder)
+
+
+def describe_step(step) -> str:
+    _, action, seconds = step
+    return f"{format_duration(seconds)} mute" if action == "mute" else action.capitalize()
+
+
+# -------- Setting definitions --------
+def _ranged_int(low: int, high: int):
+    def parse(text: str) -> int:
+        value = int(text)
+        if not low <= value <= high:
+            raise ValueError(f"Must be between {low} and {high}")
+        return value
+    return parse
+
+
+def _seconds(high: int):
+    def parse(text: str) -> int:
+        value = int(text) if text.isdigit() else parse_duration(text)
+        if not 0 <= value <= high:
+            raise ValueError(f"Must be between 0s and {format_duration(high)}")
+        return value
+    return parse
+
+
+def _parse_prefix(text: str) -> str:
+    if not 1 <= len(text) <= 5 or any(c.isspace() for c in text):
+        raise ValueError("Prefix must be 1-5 characters without spaces")
+    return text
+
+
+# Upper bound for spam_threshold, so the spam detector can size its rings once
+MAX_SPAM_THRESHOLD = 20
+
+
+class Setting:
+    def __init__(self, default, parse, description, format=str):
+        self.default = default
+        self.parse = parse
+        self.format = format
+        self.description = description
+
+
+SETTINGS = {
+    "prefix": Setting(".", _parse_prefix, "Command prefix"),
+    "xp_per_message": Setting(15, _ranged_int(0, 1000), "XP awarded per message"),
+    "xp_cooldown": Setting(60, _seconds(3600), "Seconds between XP awards per member", format_duration),
+    "levelup_cooldown": Setting(300, _seconds(86400), "Minimum time between level-up announcements", format_duration),
+    "spam_threshold": Setting(5, _ranged_int(2, MAX_SPAM_THRESHOLD), "Repeated messages that count as spam"),
+    "escalation": Setting(parse_ladder("3=mute 1h, 4=mute 1d, 5=kick, 6=ban"), parse_ladder,
+                          "Automatic action at each warn count", format_ladder),
+}
+
+
+class GuildSettings:
+    __slots__ = tuple(SETTINGS)
+
+    def __init__(self, overrides=None):
+        for key, setting in SETTINGS.items():
+            setattr(self, key, setting.default)
+        for key, value in (overrides or {}).items():
+            setattr(self, key, value)
+
+    def replace(self, key: str, value) -> "GuildSettings":
+        values = {k: getattr(self, k) for k in SETTINGS}
+        values[key] = value
+        return GuildSettings(values)
+
+    @property
+    def max_warns(self) -> int:
+        return self.escalation[-1][0] if self.escalation else 0
+
+    def warn_step(self, warns: int):
+        """The (warns, action, seconds) step to run at this warn count, or None."""
+        for step in self.escalation:
+            if step[0] == warns:
+                return step
+        if self.escalation and warns > self.escalation[-1][0]:
+            return self.escalation[-1]
+        return None
+
+
+class SettingsCache:
+    def __init__(self, db):
+        self.db = db
+        self._cache = {}
+        self._defaults = GuildSettings()
+        self._loading = {}
+        self._generation = {}  # bumped on every change so a stale load can't win
+
+    def get(self, guild_id: int) -> GuildSettings:
+        """Synchronous read for hot paths. An unknown guild gets defaults while it loads."""
+        settings = self._cache.get(guild_id)
+        if settings is None:
+            if guild_id not in self._loading:
+                self._loading[guild_id] = asyncio.create_task(self.fetch(guild_id))
+            return self._defaults
+        return settings
+
+    async def fetch(self, guild_id: int) -> GuildSettings:
+        """Read-through: return the cached settings, loading them from the database on a miss."""
+        settings = self._cache.get(guild_id)
+        if settings is not None:
+            return settings
+        generation = self._generation.get(guild_id, 0)
+        try:
+            rows = await self.db.get_guild_settings(guild_id)
+        finally:
+            self._loading.pop(guild_id, None)
+        settings = self._build(rows)
+        if self._generation.get(guild_id, 0) == generation:
+            self._cache[guild_id] = settings
+        return self._cache.get(guild_id, settings)
+
+    async def load_all(self) -> int:
+        """Load every guild's overrides in one query. Returns how many guilds have overrides."""
+        by_guild = {}
+        for guild_id, key, value in await self.db.get_guild_settings():
+            by_guild.setdefault(guild_id, []).append((guild_id, key, value))
+        for guild_id, rows in by_guild.items():
+            self._cache[guild_id] = self._build(rows)
+        return len(by_guild)
+
+    def _build(self, rows) -> GuildSettings:
+        overrides = {}
+        for _, key, value in rows:
+            setting = SETTINGS.get(key)
+            if setting is None:
+                continue  # Setting was removed
+            try:
+                overrides[key] = setting.parse(value)
+            except ValueError as e:
+                print(f"Ignoring bad stored setting {key}={value!r}: {e}")
+        return GuildSettings(overrides)
+
+    async def set(self, guild_id: int, key: str, text: str):
+        """Validate, store and apply a setting. Raises KeyError/ValueError for bad input."""
+        setting = SETTINGS[key]
+        value = setting.parse(text)
+        current = await self.fetch(guild_id)
+        await self.db.set_guild_setting(guild_id, key, setting.format(value))
+        self._generation[guild_id] = self._generation.get(guild_id, 0) + 1
+        self._cache[guild_id] = current.replace(key, value)
+        return value
+
+    async def reset(self, guild_id: int, key: str):
+        setting = SETTINGS[key]
+        current = await self.fetch(guild_id)
+        await self.db.delete_guild_setting(guild_id, key)
+        self._generation[guild_id] = self._generation.get(guild_id, 0) + 1
+        self._cache[guild_id] = current.replace(key, setting.default)
+        return setting.default
+
+    def forget(self, guild_id: int):
+        """Drop a guild from the cache (e.g. after the bot leaves it)."""
+        self._cache.pop(guild_id, None)
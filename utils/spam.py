@@ -0,0 +1,94 @@
+"""
+Sliding-window spam detection over fixed-size message digests.
+
+Each member gets a ring buffer of their last `ring_size` messages, stored as
+64-bit content digests plus timestamps in two small arrays, so a member costs
+the same memory whether they post one-word or 2000-character messages.
+A message is flagged when:
+
+- "repeat": at least `repeat_threshold` of the messages in the ring sent in
+  the last `repeat_window` seconds share its digest (repeats no longer have
+  to be consecutive), or
+- "rate": it is the `rate_limit`-th message within `rate_window` seconds.
+
+Both checks scan a fixed-size ring, so each message costs O(1). Per-member
+state lives in a TTLStore and is dropped after `memory` seconds of silence.
+"""
+
+import hashlib
+import time
+from array import array
+
+from utils.cooldowns import TTLStore
+
+REPEAT = "repeat"
+RATE = "rate"
+
+
+def digest(content: str) -> int:
+    """64-bit digest of a message, ignoring case and whitespace differences."""
+    normalized = " ".join(content.lower().split())
+    return int.from_bytes(hashlib.blake2b(normalized.encode(), digest_size=8).digest(), "little", signed=True)
+
+
+class _History:
+    __slots__ = ("digests", "times", "pos", "count")
+
+    def __init__(self, size: int):
+        self.digests = array("q", bytes(8 * size))
+        self.times = array("d", bytes(8 * size))
+        self.pos = 0
+        self.count = 0
+
+
+class SpamDetector:
+    def __init__(self, repeat_threshold: int = 5, repeat_window: float = 120.0,
+                 rate_limit: int = 10, rate_window: float = 10.0,
+                 memory: float = 600, max_repeat_threshold: int = None, clock=time.monotonic):
+        self.repeat_threshold = repeat_threshold
+        self.repeat_window = repeat_window
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        # Rings are sized for the largest per-call threshold check() may be given
+        self.ring_size = max(repeat_threshold, max_repeat_threshold or 0, rate_limit)
+        self._clock = clock
+        self._histories = TTLStore(memory, clock=clock)
+
+    def check(self, guild_id: int, user_id: int, content: str, repeat_threshold: int = None):
+        """Record a message and return REPEAT, RATE or None. repeat_threshold overrides the default."""
+        threshold = min(repeat_threshold or self.repeat_threshold, self.ring_size)
+        now = self._clock()
+        history = self._histories.get(guild_id, user_id)
+        if history is None:
+            history = _History(self.ring_size)
+        # Re-setting restarts the member's memory ttl
+        self._histories.set(guild_id, user_id, history)
+
+        size = self.ring_size
+        msg_digest = digest(content) if content.strip() else None
+        history.digests[history.pos] = msg_digest or 0
+        history.times[history.pos] = now
+        history.pos = (history.pos + 1) % size
+        history.count = min(history.count + 1, size)
+
+        if msg_digest is not None:
+            cutoff = now - self.repeat_window
+            repeats = 0
+            for i in range(history.count):
+                if history.digests[i] == msg_digest and history.times[i] >= cutoff:
+                    repeats += 1
+            if repeats >= threshold:
+                return REPEAT
+
+        if history.count >= self.rate_limit:
+            # Timestamp of the message rate_limit - 1 positions before this one
+            oldest = history.times[(history.pos - self.rate_limit) % size]
+            if oldest >= now - self.rate_window:
+                return RATE
+        return None
+
+    def reset(self, guild_id: int, user_id: int):
+        self._histories.discard(guild_id, user_id)
+
+    def metrics(self) -> dict:
+        return self._histories.metrics()
@@ -0,0 +1,172 @@
+"""
+SQLite engine with a pool of read-only WAL connections and one writer.
+
+Reads go to whichever reader connection is free, so they never queue behind
+writes. Writes are queued to a single writer task that runs everything that
+arrived within commit_interval seconds in one transaction (group commit).
+Each queued write gets its own savepoint, so one failing statement doesn't
+roll back its neighbours, and its caller is only resumed after the COMMIT.
+
+Usage:
+- engine = SQLiteEngine("levels.db"); await engine.open()
+- await engine.fetchone(sql, params) / await engine.fetchall(sql, params)
+- async for rows in engine.iterate(sql, params, batch_size)
+- await engine.execute(sql, params)  -> rows returned by the statement (RETURNING)
+- await engine.executemany(sql, seq_of_params)
+- await engine.write(fn)  -> runs `await fn(conn)` inside the group transaction
+- await engine.close()
+"""
+
+import asyncio
+import aiosqlite
+
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA mmap_size=268435456;",  # 256 MiB
+    "PRAGMA cache_size=-65536;",    # 64 MiB
+    "PRAGMA busy_timeout=5000;",
+    "PRAGMA temp_store=MEMORY;",
+)
+
+
+class SQLiteEngine:
+    def __init__(self, path: str = "levels.db", readers: int = 4,
+                 commit_interval: float = 0.005, max_batch: int = 256):
+        self.path = path
+        self.reader_count = readers
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self._writer = None
+        self._readers = []
+        self._pool = None
+        self._queue = None
+        self._writer_task = None
+
+    async def open(self):
+        # The writer creates the file and switches it to WAL before readers attach
+        self._writer = await aiosqlite.connect(self.path, isolation_level=None)
+        await self._writer.execute("PRAGMA journal_mode=WAL;")
+        for pragma in PRAGMAS:
+            await self._writer.execute(pragma)
+
+        self._pool = asyncio.Queue()
+        for _ in range(self.reader_count):
+            conn = await aiosqlite.connect(f"file:{self.path}?mode=ro", uri=True)
+            for pragma in PRAGMAS:
+                await conn.execute(pragma)
+            self._readers.append(conn)
+            self._pool.put_nowait(conn)
+
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop())
+
+    # ---------------- Reads ----------------
+    async def fetchone(self, sql: str, params=()):
+        conn = await self._pool.get()
+        try:
+            async with conn.execute(sql, params) as cur:
+                return await cur.fetchone()
+        finally:
+            self._pool.put_nowait(conn)
+
+    async def fetchall(self, sql: str, params=()):
+        conn = await self._pool.get()
+        try:
+            async with conn.execute(sql, params) as cur:
+                return await cur.fetchall()
+        finally:
+            self._pool.put_nowait(conn)
+
+    async def iterate(self, sql: str, params=(), batch_size: int = 1000):
+        """Yield lists of up to batch_size rows without materialising the whole result."""
+        conn = await self._pool.get()
+        try:
+            async with conn.execute(sql, params) as cur:
+                while True:
+                    rows = await cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            self._pool.put_nowait(conn)
+
+    # ---------------- Writes ----------------
+    async def write(self, fn):
+        """Queue `fn(conn)` for the writer and return its result once committed."""
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((fn, fut))
+        return await fut
+
+    async def execute(self, sql: str, params=()):
+        async def op(conn):
+            async with conn.execute(sql, params) as cur:
+                return await cur.fetchall()
+        return await self.write(op)
+
+    async def executemany(self, sql: str, seq_of_params):
+        async def op(conn):
+            await conn.executemany(sql, seq_of_params)
+        return await self.write(op)
+
+    async def _writer_loop(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # Let concurrent writers pile up for a few ms, then take them all
+            if self.commit_interval > 0 and self._queue.empty():
+                await asyncio.sleep(self.commit_interval)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch):
+        results = []
+        try:
+            await self._writer.execute("BEGIN;")
+            for fn, fut in batch:
+                await self._writer.execute("SAVEPOINT op;")
+                try:
+                    results.append((fut, await fn(self._writer), None))
+                    await self._writer.execute("RELEASE op;")
+                except Exception as e:
+                    await self._writer.execute("ROLLBACK TO op;")
+                    await self._writer.execute("RELEASE op;")
+                    results.append((fut, None, e))
+            await self._writer.execute("COMMIT;")
+        except Exception as e:
+            try:
+                await self._writer.execute("ROLLBACK;")
+            except Exception:
+                pass
+            for fn, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for fut, result, error in results:
+            if fut.done():
+                continue
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+
+    async def close(self):
+        if self._writer_task:
+            # Sentinel goes after any queued writes so they still commit
+            self._queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+        for conn in self._readers:
+            await conn.close()
+        self._readers = []
+        if self._writer:
+            await self._writer.close()
+            self._writer = None
@@ -0,0 +1,89 @@
+"""
+CSV / JSONL serialisation for bulk XP import and export.
+
+Both directions work batch by batch on top of Database.export_xp/import_xp,
+so memory stays flat regardless of how many rows a guild has.
+
+CSV files have a `user_id,xp` header; JSONL files hold one
+{"user_id": ..., "xp": ...} object per line. Both values must be
+non-negative integers that fit the bigint columns; the first bad line is
+reported by number and nothing is imported.
+"""
+
+import csv
+import json
+
+FORMATS = ("csv", "jsonl")
+# Largest value a Postgres bigint holds; snowflakes and XP both stay below it
+MAX_VALUE = 2**63 - 1
+
+
+def detect_format(filename: str) -> str:
+    name = filename.lower()
+    if name.endswith(".jsonl") or name.endswith(".ndjson"):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    raise ValueError("Unsupported file type, use .csv or .jsonl")
+
+
+async def write_export(db, guild_id: int, fp, fmt: str = "csv") -> int:
+    """Stream a guild's XP rows into the text file `fp`. Returns the row count."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}")
+    count = 0
+    writer = csv.writer(fp) if fmt == "csv" else None
+    if writer:
+        writer.writerow(["user_id", "xp"])
+    async for batch in db.export_xp(guild_id):
+        if writer:
+            writer.writerows(batch)
+        else:
+            fp.writelines(json.dumps({"user_id": user_id, "xp": xp}) + "\n" for user_id, xp in batch)
+        count += len(batch)
+    return count
+
+
+def _parse_rows(fp, fmt: str):
+    if fmt == "csv":
+        for line_no, row in enumerate(csv.DictReader(fp), start=2):
+            yield line_no, row.get("user_id"), row.get("xp")
+    else:
+        for line_no, line in enumerate(fp, start=1):
+            if line.strip():
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    raise ValueError(f"Line {line_no}: not valid JSON")
+                if not isinstance(obj, dict):
+                    raise ValueError(f"Line {line_no}: expected an object with user_id and xp")
+                yield line_no, obj.get("user_id"), obj.get("xp")
+
+
+def _to_int(value) -> int:
+    # JSON gives ints (bools and floats are not accepted), CSV gives strings
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError
+    return int(value)
+
+
+async def read_import(fp, fmt: str, batch_size: int = 1000):
+    """Yield validated lists of (user_id, xp) from the text file `fp`."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}")
+    batch = []
+    for line_no, user_id, xp in _parse_rows(fp, fmt):
+        try:
+            user_id, xp = _to_int(user_id), _to_int(xp)
+        except ValueError:
+            raise ValueError(f"Line {line_no}: expected integer user_id and xp")
+        if not 0 <= user_id <= MAX_VALUE:
+            raise ValueError(f"Line {line_no}: user_id {user_id} is not a valid Discord id")
+        if not 0 <= xp <= MAX_VALUE:
+            raise ValueError(f"Line {line_no}: xp must be between 0 and {MAX_VALUE}")
+        batch.append((user_id, xp))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch